@@ -12,4 +12,6 @@ admin.site.register(Like)
 admin.site.register(UserEmail)
 admin.site.register(EmailOTP)
 admin.site.register(Follow)
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+admin.site.register(TimelineEntry)
+admin.site.register(TrendingScore)
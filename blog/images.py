@@ -0,0 +1,279 @@
+"""
+Resized variants and placeholders of uploaded images (post images and
+profile pictures).
+
+Each upload is rendered to a few widths in WebP and JPEG by `render_variants`,
+a plain function that only needs the file's bytes, so it runs in a process
+pool once the upload is committed instead of in the request. The pool's
+results are written to the image field's storage and recorded on the model by
+a single writer thread, which retries while another connection holds the
+database's write lock:
+
+    {"source": "blogs/photo.jpg", "width": 4000, "height": 3000,
+     "webp": [["blogs/variants/photo-1a2b3c4d5e6f-thumb.webp", 160], ...],
+     "jpg": [...]}
+
+The same pass computes a placeholder shown until the image arrives: its
+dominant color and a 16px wide WebP inlined as a data URI (a few hundred bytes).
+
+    {"source": "blogs/photo.jpg", "color": "#3a5f8c", "lqip": "data:image/webp;base64,..."}
+
+`source` is the image name both were made from, so a replaced image is never
+served with the old ones. Templates emit them with the `{% picture %}` tag in
+`blog.templatetags.images`. Existing images are processed with
+`manage.py generate_image_variants`.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+import time
+from base64 import b64encode
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import OperationalError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# (label, width in px); an image is never upscaled, so small uploads get fewer variants
+IMAGE_VARIANTS = (
+    ('thumb', 160),
+    ('card', 640),
+    ('full', 1600),
+)
+
+# (file extension, Pillow format, save options)
+IMAGE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# Placeholder image width in px, and the colors the dominant one is picked from
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_COLORS = 8
+
+# Worker processes rendering variants
+IMAGE_WORKERS = 2
+
+# Attempts at recording rendered variants while the database is locked, and
+# the first pause between them (doubled after each attempt)
+STORE_ATTEMPTS = 5
+STORE_RETRY_SECONDS = 0.2
+
+# Model fields of an image: the upload, its variants and its placeholder
+ImageFields = namedtuple('ImageFields', ['image', 'variants', 'placeholder'])
+BLOG_IMAGE = ImageFields('image', 'image_variants', 'image_placeholder')
+PROFILE_PICTURE = ImageFields('profile_picture', 'picture_variants', 'picture_placeholder')
+
+_lock = threading.Lock()
+_pool = None
+_writer = None
+
+
+def _open_rgb(data):
+    """The image in `data` upright and in RGB, transparent areas flattened onto white"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            # JPEG has no alpha channel
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def _placeholder(image):
+    from PIL import Image
+
+    width, height = image.size
+    tiny = image.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BOX
+    )
+    # Most frequent color of a small palette, not the mean (which turns to grey)
+    palette = tiny.quantize(colors=PLACEHOLDER_COLORS)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=40)
+    return {
+        'color': f'#{red:02x}{green:02x}{blue:02x}',
+        'lqip': 'data:image/webp;base64,' + b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def render_placeholder(data):
+    """Placeholder of the image in `data` (bytes): {"color", "lqip"}. Runs in a worker process."""
+    return _placeholder(_open_rgb(data))
+
+
+def render_variants(data):
+    """
+    Render every variant of the image in `data` (bytes), and its placeholder.
+    Runs in a worker process, so it touches neither the database nor storage.
+    Returns {"width", "height", "digest", "placeholder",
+    "variants": [(label, ext, width, bytes), ...]}.
+    """
+    from PIL import Image
+
+    image = _open_rgb(data)
+    width, height = image.size
+    variants = []
+    for label, target in IMAGE_VARIANTS:
+        scaled = min(target, width)
+        resized = image if scaled == width else image.resize(
+            (scaled, max(1, round(height * scaled / width))), Image.LANCZOS
+        )
+        for ext, image_format, options in IMAGE_FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            variants.append((label, ext, scaled, buffer.getvalue()))
+        if scaled == width:
+            break
+
+    return {
+        'width': width,
+        'height': height,
+        'digest': source_digest(data),
+        'placeholder': _placeholder(image),
+        'variants': variants,
+    }
+
+
+def source_digest(data):
+    """The digest of an image's bytes that its variant names carry"""
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def variant_name(source, digest, label, ext):
+    """blogs/photo.jpg -> blogs/variants/photo-<digest>-card.webp"""
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{digest}-{label}.{ext}')
+
+
+def renamed_variant(name, source):
+    """The name variant `name` (of another file with the same bytes) has for `source`"""
+    filename = posixpath.basename(name)
+    _, digest, last = filename.rsplit('-', 2)
+    label, ext = posixpath.splitext(last)
+    return variant_name(source, digest, label, ext.lstrip('.'))
+
+
+def image_storage(model, fields):
+    """The storage an image field (and so its variants) is saved to"""
+    return model._meta.get_field(fields.image).storage
+
+
+def stored_variants(source, storage):
+    """
+    Variant files of `source` in `storage`. Their names are derived from the
+    source's bytes, so this works whether or not any row still records them.
+    """
+    try:
+        with storage.open(source, 'rb') as f:
+            digest = source_digest(f.read())
+    except OSError:
+        return []
+    names = (
+        variant_name(source, digest, label, ext)
+        for label, _ in IMAGE_VARIANTS for ext, _, _ in IMAGE_FORMATS
+    )
+    return [name for name in names if storage.exists(name)]
+
+
+def store_variants(model, pk, fields, source, result):
+    """
+    Save rendered variants and record them and the placeholder on the row,
+    unless its image has changed since. Variant names include a digest of the
+    source bytes, so files that already exist (the shared default profile
+    picture) are reused.
+    """
+    storage = image_storage(model, fields)
+    variants = {'source': source, 'width': result['width'], 'height': result['height']}
+    for ext, _, _ in IMAGE_FORMATS:
+        variants[ext] = []
+    for label, ext, width, data in result['variants']:
+        name = variant_name(source, result['digest'], label, ext)
+        if not storage.exists(name):
+            name = storage.save_derived(name, ContentFile(data))
+        variants[ext].append([name, width])
+
+    return model.objects.filter(pk=pk, **{fields.image: source}).update(**{
+        fields.variants: variants,
+        fields.placeholder: {'source': source, **result['placeholder']},
+    })
+
+
+def store_placeholder(model, pk, fields, source, placeholder):
+    """Record a placeholder on the row, unless its image has changed since"""
+    return model.objects.filter(pk=pk, **{fields.image: source}).update(
+        **{fields.placeholder: {'source': source, **placeholder}}
+    )
+
+
+def pending_source(instance, field_name, derived_field):
+    """
+    The image name of `instance` if `derived_field` (variants or placeholder)
+    was not made from it yet, else None
+    """
+    image = getattr(instance, field_name)
+    if not image or (getattr(instance, derived_field) or {}).get('source') == image.name:
+        return None
+    return image.name
+
+
+def _executors():
+    global _pool, _writer
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+            # Storage and database writes stay on one thread with its own connection
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+        return _pool, _writer
+
+
+def _store_rendered(model, pk, fields, source, future):
+    try:
+        result = future.result()
+        for attempt in range(STORE_ATTEMPTS):
+            try:
+                store_variants(model, pk, fields, source, result)
+                return
+            except OperationalError:
+                # SQLite's "database is locked": a request is writing, try again shortly
+                if attempt == STORE_ATTEMPTS - 1:
+                    raise
+                connections.close_all()
+                time.sleep(STORE_RETRY_SECONDS * 2 ** attempt)
+    except Exception:
+        logger.exception("Could not generate variants of %s", source)
+    finally:
+        connections.close_all()
+
+
+def _submit(model, pk, fields, source):
+    try:
+        with image_storage(model, fields).open(source, 'rb') as f:
+            data = f.read()
+    except OSError:
+        logger.warning("Image %s is missing from storage", source)
+        return
+    pool, writer = _executors()
+    pool.submit(render_variants, data).add_done_callback(
+        lambda future: writer.submit(_store_rendered, model, pk, fields, source, future)
+    )
+
+
+def schedule_variants(instance, fields):
+    """Render variants and the placeholder of a newly saved image in the pool once the save is committed"""
+    source = pending_source(instance, fields.image, fields.variants)
+    if source is not None:
+        model, pk = type(instance), instance.pk
+        transaction.on_commit(lambda: _submit(model, pk, fields, source))
@@ -0,0 +1,83 @@
+"""
+Shared pieces of the maintenance commands that work through a whole table.
+
+Tables are walked by primary key: each chunk is the index range after the
+last one, so a chunk deep into a large table costs the same as the first
+(no OFFSET scans) and rows committed meanwhile are simply picked up.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+
+def pk_chunks(queryset, chunk_size):
+    """Rows of `queryset` in primary-key order, as lists of up to `chunk_size`"""
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1].pk
+        yield rows
+
+
+class RecountCommand(BaseCommand):
+    """
+    Repairs denormalized counters: rows are checked chunk by chunk against the
+    true counts and only those that drifted are rewritten.
+
+    Subclasses name the queryset methods that annotate the true counts and
+    rewrite the counters, and the annotation each counter column is checked
+    against.
+    """
+
+    models = ()
+    counters = {}        # counter column -> annotation holding its true value
+    annotate_method = ''
+    recount_method = ''
+    chunk_size = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=self.chunk_size,
+            help=f'Rows checked per chunk (default: {self.chunk_size})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows have drifted',
+        )
+
+    def handle(self, *args, **options):
+        for model in self.models:
+            checked, drifted = self.recount(model, options['chunk_size'], options['dry_run'])
+            self.report(model, checked, drifted, options['dry_run'])
+
+    def recount(self, model, chunk_size, dry_run=False):
+        """Check every row of `model`; returns (checked, drifted) counts"""
+        checked = 0
+        drifted = 0
+        matches = Q(**{column: F(actual) for column, actual in self.counters.items()})
+
+        for rows in pk_chunks(model.objects.only('pk'), chunk_size):
+            ids = [row.pk for row in rows]
+            checked += len(ids)
+            annotated = getattr(model.objects.filter(pk__in=ids), self.annotate_method)()
+            changed = list(annotated.exclude(matches).values_list('pk', flat=True))
+            if changed and not dry_run:
+                with transaction.atomic():
+                    getattr(model.objects.filter(pk__in=changed), self.recount_method)()
+            drifted += len(changed)
+
+        return checked, drifted
+
+    def report(self, model, checked, drifted, dry_run):
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} {model._meta.verbose_name}(s). {verb} {drifted} with drifted counters."
+        ))
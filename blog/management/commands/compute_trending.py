@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.trending import compute_trending, notify_trending
+
+
+class Command(BaseCommand):
+    help = "Refresh precomputed trending scores (only posts with new activity) and notify authors who entered the top 3. Run periodically, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rescore every published blog instead of only changed ones',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rescored, removed = compute_trending(full=options['full'])
+            notified = notify_trending()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {rescored} blog(s), removed {removed} expired score(s), "
+            f"sent {notified} trending notification(s)."
+        ))
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.images import renamed_variant
+from blog.management.chunked import pk_chunks
+from blog.models import Blog, MediaFile, Profile
+from blog.storage import is_content_name, media_storage
+
+# (model, image field, fields derived from the image)
+MEDIA_FIELDS = (
+    (Blog, 'image', ('image_variants', 'image_placeholder')),
+    (Profile, 'profile_picture', ('picture_variants', 'picture_placeholder')),
+)
+
+
+class Command(BaseCommand):
+    help = "Move images uploaded before content-addressed storage into its hashed layout, merging byte-identical copies."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Media files checked per chunk (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        storage = media_storage()
+        moved = 0
+        merged = 0
+        missing = 0
+
+        for files in pk_chunks(MediaFile.objects.only('pk', 'name'), options['chunk_size']):
+            for name in [media_file.name for media_file in files]:
+                if is_content_name(name):
+                    continue
+                try:
+                    with storage.open(name, 'rb') as f:
+                        new_name = storage.save(name, f)
+                except FileNotFoundError:
+                    self.stderr.write(f"Missing file: {name}")
+                    missing += 1
+                    continue
+                # Another legacy copy of the same bytes was moved already
+                existed = MediaFile.objects.filter(name=new_name).exists()
+                self.move_references(name, new_name)
+                moved += 1
+                merged += existed
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} file(s) into content-addressed storage ({merged} merged into an existing copy). "
+            f"{missing} missing."
+        ))
+
+    @staticmethod
+    def move_variant(name, new_source):
+        """
+        Copy a variant to its name under `new_source`: the old one is deleted
+        with the old file (variant names are derived from the original's name).
+        """
+        storage = media_storage()
+        new_name = renamed_variant(name, new_source)
+        if not storage.exists(new_name):
+            try:
+                with storage.open(name, 'rb') as f:
+                    storage.save_derived(new_name, f)
+            except FileNotFoundError:
+                pass
+        return new_name
+
+    def move_references(self, old_name, new_name):
+        """Point every row at `new_name`; the old file goes with its last reference"""
+        with transaction.atomic():
+            references = 0
+            for model, field_name, derived_fields in MEDIA_FIELDS:
+                rows = list(
+                    model.objects.select_for_update()
+                    .filter(**{field_name: old_name})
+                    .only('pk', field_name, *derived_fields)
+                )
+                for row in rows:
+                    setattr(row, field_name, new_name)
+                    for derived_field in derived_fields:
+                        derived = getattr(row, derived_field)
+                        # Variants and placeholders depend on the bytes only, so they stay valid
+                        if derived and derived.get('source') == old_name:
+                            derived['source'] = new_name
+                            for ext in ('webp', 'jpg'):
+                                for variant in derived.get(ext, []):
+                                    variant[0] = self.move_variant(variant[0], new_name)
+                # bulk_update sends no signals: references are moved explicitly below
+                model.objects.bulk_update(rows, [field_name, *derived_fields])
+                references += len(rows)
+
+            MediaFile.acquire([new_name] * references)
+            MediaFile.objects.filter(name=old_name).update(ref_count=0)
+        MediaFile.collect([old_name])
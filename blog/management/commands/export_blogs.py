@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import TRANSFER_CHUNK_SIZE, export_blogs
+
+
+class Command(BaseCommand):
+    help = "Stream every blog post (with tags, category, likes and comments) as JSONL, one post per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write (default: stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=TRANSFER_CHUNK_SIZE,
+            help=f'Posts fetched per query (default: {TRANSFER_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            written = export_blogs(sys.stdout, options['chunk_size'])
+            self.stderr.write(self.style.SUCCESS(f"Exported {written} blog(s)."))
+            return
+
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            written = export_blogs(stream, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Exported {written} blog(s) to {options['output']}."))
@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from blog.images import (
+    BLOG_IMAGE, PROFILE_PICTURE, image_storage, pending_source, render_placeholder, render_variants,
+    store_placeholder, store_variants,
+)
+from blog.management.chunked import pk_chunks
+from blog.models import Blog, Profile
+
+IMAGE_FIELDS = (
+    (Blog, BLOG_IMAGE),
+    (Profile, PROFILE_PICTURE),
+)
+
+
+class Command(BaseCommand):
+    help = "Render the resized WebP/JPEG variants and loading placeholders of post images and profile pictures that do not have them yet (e.g. uploaded before they existed), in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Rows checked per chunk (default: 200)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes rendering images (default: one per CPU)',
+        )
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for model, fields in IMAGE_FIELDS:
+                rendered, placeholders, failed = self.generate(pool, model, fields, options['chunk_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Rendered variants of {rendered} and placeholders of {placeholders} "
+                    f"{model.__name__.lower()} image(s). {failed} failed."
+                ))
+
+    def generate(self, pool, model, fields, chunk_size):
+        storage = image_storage(model, fields)
+        rendered = 0
+        placeholders = 0
+        failed = 0
+
+        images = model.objects.exclude(**{fields.image: ''}).exclude(**{f'{fields.image}__isnull': True})
+        for rows in pk_chunks(images.only('pk', *fields), chunk_size):
+            # Rows sharing a file (the default profile picture) are rendered once.
+            # Rows that only lack a placeholder (variants made before placeholders
+            # existed) get just that.
+            jobs = {}
+            for row in rows:
+                source = pending_source(row, fields.image, fields.variants)
+                if source is not None:
+                    jobs.setdefault((source, render_variants), []).append(row.pk)
+                    continue
+                source = pending_source(row, fields.image, fields.placeholder)
+                if source is not None:
+                    jobs.setdefault((source, render_placeholder), []).append(row.pk)
+
+            futures = {}
+            for (source, render), pks in jobs.items():
+                try:
+                    with storage.open(source, 'rb') as f:
+                        futures[source, render] = pool.submit(render, f.read())
+                except OSError:
+                    self.stderr.write(f"Missing file: {source}")
+                    failed += len(pks)
+
+            for (source, render), future in futures.items():
+                pks = jobs[source, render]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    self.stderr.write(f"Could not render {source}: {exc}")
+                    failed += len(pks)
+                    continue
+                for pk in pks:
+                    if render is render_variants:
+                        rendered += store_variants(model, pk, fields, source, result)
+                    else:
+                        placeholders += store_placeholder(model, pk, fields, source, result)
+
+        return rendered, placeholders, failed
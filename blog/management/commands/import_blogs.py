@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import TRANSFER_CHUNK_SIZE, import_blogs
+
+
+class Command(BaseCommand):
+    help = "Load blog posts from a JSONL file written by export_blogs, in chunked bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='JSONL file to read ("-" for stdin)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=TRANSFER_CHUNK_SIZE,
+            help=f'Posts inserted per transaction (default: {TRANSFER_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Create accounts (without a usable password) for unknown usernames instead of skipping their content',
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            stats = import_blogs(sys.stdin, options['chunk_size'], options['create_users'])
+        else:
+            with open(options['path'], encoding='utf-8') as stream:
+                stats = import_blogs(stream, options['chunk_size'], options['create_users'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.get('blogs', 0)} blog(s), {stats.get('comments', 0)} comment(s), "
+            f"{stats.get('likes', 0)} like(s); created {stats.get('users', 0)} user(s). "
+            f"Skipped {stats.get('skipped_existing', 0)} existing blog(s) and "
+            f"{stats.get('skipped_no_author', 0)} with an unknown author."
+        ))
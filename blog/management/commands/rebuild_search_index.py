@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Blog
+from blog.search import search_backend
+from blog.user_search import user_search_backend
+
+
+class Command(BaseCommand):
+    help = "Recreate the blog full-text index and the user search index from the database tables."
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        user_backend = user_search_backend()
+        with transaction.atomic():
+            backend.install()
+            backend.rebuild()
+            user_backend.install()
+            user_backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {Blog.objects.count()} blog(s) with {type(backend).__name__} and "
+            f"{User.objects.count()} user(s) with {type(user_backend).__name__}."
+        ))
@@ -0,0 +1,11 @@
+from blog.management.chunked import RecountCommand
+from blog.models import Blog
+
+
+class Command(RecountCommand):
+    help = "Repair drift in Blog.like_count / Blog.comment_count by recounting from Like and Comment, in chunks."
+
+    models = (Blog,)
+    counters = {'like_count': 'actual_likes', 'comment_count': 'actual_comments'}
+    annotate_method = 'with_actual_stats'
+    recount_method = 'recount_stats'
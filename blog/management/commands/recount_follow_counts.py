@@ -0,0 +1,11 @@
+from blog.management.chunked import RecountCommand
+from blog.models import Profile
+
+
+class Command(RecountCommand):
+    help = "Repair drift in Profile.followers_count / Profile.following_count by recounting approved Follows, in chunks."
+
+    models = (Profile,)
+    counters = {'followers_count': 'actual_followers', 'following_count': 'actual_following'}
+    annotate_method = 'with_actual_follow_counts'
+    recount_method = 'recount_follows'
@@ -0,0 +1,45 @@
+from blog.management.chunked import RecountCommand
+from blog.models import Blog, MediaFile, Profile
+
+# (model, image field) whose files are reference counted
+MEDIA_FIELDS = (
+    (Blog, 'image'),
+    (Profile, 'profile_picture'),
+)
+
+
+class Command(RecountCommand):
+    help = "Repair MediaFile.ref_count from the Blog/Profile tables, in chunks, and delete files nothing references any more."
+
+    models = (MediaFile,)
+    counters = {'ref_count': 'actual_references'}
+    annotate_method = 'with_actual_references'
+    recount_method = 'recount_references'
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            return super().handle(*args, **options)
+        added = self.add_missing()
+        checked, updated = self.recount(MediaFile, options['chunk_size'])
+        deleted = MediaFile.collect()
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} media file(s). Added {added}, updated {updated} reference count(s), "
+            f"deleted {deleted} unreferenced file(s)."
+        ))
+
+    def add_missing(self):
+        """Rows for referenced files that have none (e.g. written by raw SQL)"""
+        added = 0
+        for model, field_name in MEDIA_FIELDS:
+            default = model._meta.get_field(field_name).default
+            names = (
+                model.objects.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .exclude(**{field_name: default})
+                .exclude(**{f'{field_name}__in': MediaFile.objects.values('name')})
+                .order_by().values_list(field_name, flat=True).distinct()
+            )
+            rows = [MediaFile(name=name) for name in names]
+            MediaFile.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+            added += len(rows)
+        return added
@@ -0,0 +1,19 @@
+from blog.management.chunked import RecountCommand
+from blog.models import Category, Tag
+from blog.vocabulary import bump_vocabulary_version
+
+
+class Command(RecountCommand):
+    help = "Repair drift in Tag.usage_count / Category.usage_count (suggestion popularity) by recounting from the Blog tables, in chunks."
+
+    models = (Tag, Category)
+    counters = {'usage_count': 'actual_usage'}
+    annotate_method = 'with_actual_usage'
+    recount_method = 'recount_usage'
+
+    def recount(self, model, chunk_size, dry_run=False):
+        checked, drifted = super().recount(model, chunk_size, dry_run)
+        if drifted and not dry_run:
+            # Suggestion order changed: drop cached responses
+            bump_vocabulary_version(model)
+        return checked, drifted
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from blog.management.chunked import pk_chunks
+from blog.models import Blog
+from blog.rendering import CONTENT_RENDERER_VERSION
+
+RENDERED_FIELDS = ['content_html', 'word_count', 'reading_time', 'excerpt', 'content_version']
+
+
+class Command(BaseCommand):
+    help = "Re-render content_html, word counts, reading times and empty excerpts of posts rendered by an older renderer version, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Posts rendered per chunk (default: 500)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-render every post, not only outdated ones',
+        )
+
+    def handle(self, *args, **options):
+        posts = Blog.objects.all()
+        if not options['all']:
+            posts = posts.exclude(content_version=CONTENT_RENDERER_VERSION)
+
+        rendered = 0
+        for blogs in pk_chunks(posts.only('id', 'content', 'excerpt'), options['chunk_size']):
+            for blog in blogs:
+                blog.render_content()
+            # bulk_update leaves updated_at alone: re-rendering is not an edit
+            Blog.objects.bulk_update(blogs, RENDERED_FIELDS)
+            rendered += len(blogs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} post(s) with renderer version {CONTENT_RENDERER_VERSION}."
+        ))
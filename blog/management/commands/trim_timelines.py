@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from blog.models import TimelineEntry
+from blog.timeline import TIMELINE_MAX_ENTRIES, trim_timeline
+
+
+class Command(BaseCommand):
+    help = "Cap every user's Following timeline to the newest N entries (run periodically, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=TIMELINE_MAX_ENTRIES,
+            help=f'Entries to keep per user (default: {TIMELINE_MAX_ENTRIES})',
+        )
+
+    def handle(self, *args, **options):
+        keep = options['keep']
+
+        # Only timelines that are actually over the cap
+        oversized = (
+            TimelineEntry.objects.values('user')
+            .annotate(total=Count('id'))
+            .filter(total__gt=keep)
+            .values_list('user', flat=True)
+        )
+
+        trimmed_users = 0
+        deleted = 0
+        for user_id in oversized.iterator():
+            deleted += trim_timeline(user_id, keep=keep)
+            trimmed_users += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trimmed {trimmed_users} timeline(s), deleted {deleted} entr{'y' if deleted == 1 else 'ies'}."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0013_notification"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="blog_blog_is_publ_3b5577_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="blog_blog_author__0847b5_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "-created_at", "-id"],
+                name="blog_notifi_recipie_7e03e5_idx",
+            ),
+        ),
+    ]
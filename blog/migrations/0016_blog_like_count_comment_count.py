@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    """Populate the new counter columns from the Like and Comment tables"""
+    Blog = apps.get_model("blog", "Blog")
+    Like = apps.get_model("blog", "Like")
+    Comment = apps.get_model("blog", "Comment")
+
+    likes = (
+        Like.objects.filter(blog=OuterRef("pk"))
+        .order_by()
+        .values("blog")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    comments = (
+        Comment.objects.filter(blog=OuterRef("pk"))
+        .order_by()
+        .values("blog")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Blog.objects.update(
+        like_count=Coalesce(Subquery(likes), 0),
+        comment_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0015_timelineentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="blog",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0016_blog_like_count_comment_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "window",
+                    models.CharField(
+                        choices=[
+                            ("today", "Today"),
+                            ("week", "This Week"),
+                            ("month", "This Month"),
+                            ("all", "All Time"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("created_at", models.DateTimeField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                ("likes", models.PositiveIntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-score"],
+            },
+        ),
+        migrations.AddField(
+            model_name="trendingscore",
+            name="blog",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="trending_scores",
+                to="blog.blog",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trendingscore",
+            index=models.Index(
+                fields=["window", "-score", "-blog"],
+                name="blog_trendi_window_07954d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trendingscore",
+            index=models.Index(
+                fields=["window", "created_at"], name="blog_trendi_window_9f3ef7_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="trendingscore",
+            unique_together={("blog", "window")},
+        ),
+    ]
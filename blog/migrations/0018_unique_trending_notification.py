@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_trending(apps, schema_editor):
+    """Keep the oldest trending notification per (recipient, blog) so the constraint can be added"""
+    Notification = apps.get_model("blog", "Notification")
+
+    trending = Notification.objects.filter(
+        notification_type="trending", blog__isnull=False
+    )
+    keep = (
+        trending.order_by()
+        .values("recipient", "blog")
+        .annotate(first_id=Min("id"))
+        .values_list("first_id", flat=True)
+    )
+    trending.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0017_trendingscore"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_trending, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("notification_type", "trending")),
+                fields=("recipient", "blog"),
+                name="unique_trending_notification",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index for this database and fill it from existing posts"""
+    from blog.search import search_backend
+
+    backend = search_backend(schema_editor.connection)
+    backend.install()
+    backend.rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    from blog.search import search_backend
+
+    search_backend(schema_editor.connection).uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0018_unique_trending_notification"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_reply_counts(apps, schema_editor):
+    """Populate reply_count from the approved replies of each comment"""
+    Comment = apps.get_model("blog", "Comment")
+
+    replies = (
+        Comment.objects.filter(parent=OuterRef("pk"), is_approved=True)
+        .order_by()
+        .values("parent")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Comment.objects.update(reply_count=Coalesce(Subquery(replies), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0019_blog_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="reply_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reply_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["blog", "parent", "created_at", "id"],
+                name="blog_commen_blog_id_36f650_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["parent", "created_at", "id"],
+                name="blog_commen_parent__5189e9_idx",
+            ),
+        ),
+    ]
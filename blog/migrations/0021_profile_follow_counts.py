@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    """Populate the new counter columns from approved Follow rows"""
+    Profile = apps.get_model("blog", "Profile")
+    Follow = apps.get_model("blog", "Follow")
+
+    followers = (
+        Follow.objects.filter(following=OuterRef("user"), is_approved=True)
+        .order_by()
+        .values("following")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    following = (
+        Follow.objects.filter(follower=OuterRef("user"), is_approved=True)
+        .order_by()
+        .values("follower")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Profile.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        following_count=Coalesce(Subquery(following), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0020_comment_reply_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0021_profile_follow_counts"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["following", "is_approved", "-created_at", "-id"],
+                name="blog_follow_followi_ab6764_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_user_search_index(apps, schema_editor):
+    """Create the user search index for this database and fill it from existing users"""
+    from blog.user_search import user_search_backend
+
+    backend = user_search_backend(schema_editor.connection)
+    backend.install()
+    backend.rebuild()
+
+
+def drop_user_search_index(apps, schema_editor):
+    from blog.user_search import user_search_backend
+
+    user_search_backend(schema_editor.connection).uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0022_follow_request_inbox_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_user_search_index, drop_user_search_index),
+    ]
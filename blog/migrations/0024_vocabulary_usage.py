@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:57
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_usage_counts(apps, schema_editor):
+    """Populate the new usage columns from existing posts"""
+    Blog = apps.get_model("blog", "Blog")
+    Category = apps.get_model("blog", "Category")
+    Tag = apps.get_model("blog", "Tag")
+
+    categories = (
+        Blog.objects.filter(category=OuterRef("pk"))
+        .order_by()
+        .values("category")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    tags = (
+        Blog.tags.through.objects.filter(tag=OuterRef("pk"))
+        .order_by()
+        .values("tag")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Category.objects.update(usage_count=Coalesce(Subquery(categories), 0))
+    Tag.objects.update(usage_count=Coalesce(Subquery(tags), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0023_user_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="usage_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="usage_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="blog_category_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="blog_tag_name_lower_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_usage_counts, migrations.RunPython.noop),
+    ]
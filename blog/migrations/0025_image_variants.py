@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0024_vocabulary_usage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="picture_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+import blog.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_references(apps, schema_editor):
+    """One MediaFile row per file already referenced (the shared default picture excluded)"""
+    Blog = apps.get_model("blog", "Blog")
+    Profile = apps.get_model("blog", "Profile")
+    MediaFile = apps.get_model("blog", "MediaFile")
+
+    counts = {}
+    for model, field in ((Blog, "image"), (Profile, "profile_picture")):
+        rows = (
+            model.objects.exclude(**{field: ""})
+            .exclude(**{f"{field}__isnull": True})
+            .exclude(**{field: "default_pic.png"})
+            .order_by()
+            .values_list(field)
+            .annotate(total=Count("pk"))
+        )
+        for name, total in rows:
+            counts[name] = counts.get(name, 0) + total
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=name, ref_count=total) for name, total in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0025_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="blog",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                null=True,
+                storage=blog.storage.media_storage,
+                upload_to="blogs/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="profile",
+            name="profile_picture",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                default="default_pic.png",
+                null=True,
+                storage=blog.storage.media_storage,
+                upload_to="profiles/",
+            ),
+        ),
+        migrations.RunPython(count_existing_references, migrations.RunPython.noop),
+    ]
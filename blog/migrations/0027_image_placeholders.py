@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0026_media_files"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="image_placeholder",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="picture_placeholder",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+from blog.rendering import (
+    CONTENT_RENDERER_VERSION,
+    count_words,
+    make_excerpt,
+    reading_minutes,
+    render_content,
+)
+
+
+def render_existing_posts(apps, schema_editor):
+    """Render the bodies of existing posts (historical models have no Blog.save)"""
+    Blog = apps.get_model("blog", "Blog")
+    fields = [
+        "content_html",
+        "word_count",
+        "reading_time",
+        "excerpt",
+        "content_version",
+    ]
+    batch = []
+    for blog in Blog.objects.only("pk", "content", "excerpt").iterator(chunk_size=500):
+        blog.content_html = render_content(blog.content)
+        blog.word_count = count_words(blog.content)
+        blog.reading_time = reading_minutes(blog.word_count)
+        if not (blog.excerpt or "").strip():
+            blog.excerpt = make_excerpt(blog.content)
+        blog.content_version = CONTENT_RENDERER_VERSION
+        batch.append(blog)
+        if len(batch) == 500:
+            Blog.objects.bulk_update(batch, fields)
+            batch = []
+    Blog.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0027_image_placeholders"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="content_html",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="blog",
+            name="content_version",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="blog",
+            name="reading_time",
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="blog",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
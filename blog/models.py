@@ -1,11 +1,56 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest, Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify
 import uuid
+from collections import Counter
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password, check_password
 
+from .rendering import CONTENT_RENDERER_VERSION, count_words, make_excerpt, reading_minutes, render_content
+from .images import stored_variants
+from .storage import media_storage
+from .vocabulary import bump_vocabulary_version
+
+# COUNT SUBQUERIES
+def count_subquery(rows, field, outer='pk'):
+    """
+    Correlated COUNT(*) of the `rows` whose `field` equals the outer row's
+    `outer` column (0 when there are none), for annotate() and update() of the
+    denormalized counters.
+    """
+    total = (
+        rows.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(total), 0)
+
+
+# PROFILE QUERYSET
+class ProfileQuerySet(models.QuerySet):
+    """Reusable query helpers for profiles"""
+
+    def _follow_subqueries(self):
+        """Correlated COUNT(*) subqueries for approved followers / followings of each profile's user"""
+        approved = Follow.objects.filter(is_approved=True)
+        return count_subquery(approved, 'following', 'user'), count_subquery(approved, 'follower', 'user')
+
+    def with_actual_follow_counts(self):
+        """Annotate the true follower/following totals counted from the Follow table"""
+        followers, following = self._follow_subqueries()
+        return self.annotate(actual_followers=followers, actual_following=following)
+
+    def recount_follows(self):
+        """Rewrite the denormalized followers_count / following_count columns from Follow"""
+        followers, following = self._follow_subqueries()
+        return self.update(followers_count=followers, following_count=following)
+
+
+
 # PROFILE MODEL
 class Profile(models.Model):
     """
@@ -33,10 +78,15 @@ class Profile(models.Model):
     date_of_birth = models.DateField(blank=True, null=True)
     profile_picture = models.ImageField(
         upload_to='profiles/',
+        storage=media_storage,
         default='default_pic.png',
         blank=True,
-        null=True
+        null=True,
+        db_index=True,
     )
+    # Resized copies of profile_picture and its loading placeholder (see blog.images)
+    picture_variants = models.JSONField(default=dict, blank=True)
+    picture_placeholder = models.JSONField(default=dict, blank=True)
     
     # Social Media Links
     website = models.URLField(blank=True, null=True)
@@ -52,9 +102,16 @@ class Profile(models.Model):
         default='public'
     )
     
+    # Denormalized approved-follow counters (kept in sync by Follow.adjust_counts,
+    # repaired by `manage.py recount_follow_counts`)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProfileQuerySet.as_manager()
     
     def __str__(self):
         return self.user.username
@@ -73,6 +130,66 @@ class Profile(models.Model):
         return None
 
 
+# VOCABULARY QUERYSETS
+class VocabularyQuerySet(models.QuerySet):
+    """Prefix suggestions shared by Tag and Category"""
+
+    def suggest(self, prefix, limit):
+        """
+        Names starting with `prefix` (case-insensitive), most used first.
+        The prefix is matched as a range on lower(name) so the expression index
+        serves it on every backend, unlike LIKE.
+        """
+        prefix = prefix.strip().lower()
+        names = self.alias(name_lower=Lower('name'))
+        if prefix:
+            names = names.filter(name_lower__gte=prefix, name_lower__lt=prefix + '\U0010ffff')
+        return names.order_by('-usage_count', 'name').values_list('name', flat=True)[:limit]
+
+    def adjust_usage(self, deltas):
+        """
+        Add `deltas` ({row id: change in posts}) to usage_count. Call inside the
+        transaction that changes the posts; `manage.py recount_vocabulary_usage`
+        repairs any drift.
+        """
+        ids_by_delta = {}
+        for pk, delta in deltas.items():
+            if pk is not None and delta:
+                ids_by_delta.setdefault(delta, []).append(pk)
+        for delta, ids in ids_by_delta.items():
+            self.filter(pk__in=ids).update(usage_count=Greatest(F('usage_count') + delta, 0))
+        if ids_by_delta:
+            # Suggestion order changed: drop cached responses
+            bump_vocabulary_version(self.model)
+
+
+class CategoryQuerySet(VocabularyQuerySet):
+    def _posts(self):
+        return count_subquery(Blog.objects.all(), 'category')
+
+    def with_actual_usage(self):
+        """Annotate the true number of posts in each category"""
+        return self.annotate(actual_usage=self._posts())
+
+    def recount_usage(self):
+        """Rewrite the denormalized usage_count column from the Blog table"""
+        return self.update(usage_count=self._posts())
+
+
+class TagQuerySet(VocabularyQuerySet):
+    def _posts(self):
+        return count_subquery(Blog.tags.through.objects.all(), 'tag')
+
+    def with_actual_usage(self):
+        """Annotate the true number of posts using each tag"""
+        return self.annotate(actual_usage=self._posts())
+
+    def recount_usage(self):
+        """Rewrite the denormalized usage_count column from the post-tag table"""
+        return self.update(usage_count=self._posts())
+
+
+
 # CATEGORY MODEL
 class Category(models.Model):
     """Blog post categories for organizing content"""
@@ -81,9 +198,19 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True, null=True)
 
+    # Posts in this category (kept in sync by VocabularyQuerySet.adjust_usage,
+    # repaired by `manage.py recount_vocabulary_usage`)
+    usage_count = models.PositiveIntegerField(default=0)
+
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            # Case-insensitive prefix lookups for suggestions
+            models.Index(Lower('name'), name='blog_category_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -103,8 +230,18 @@ class Tag(models.Model):
     name = models.CharField(max_length=30, unique=True)
     slug = models.SlugField(unique=True)
 
+    # Posts carrying this tag (kept in sync by VocabularyQuerySet.adjust_usage,
+    # repaired by `manage.py recount_vocabulary_usage`)
+    usage_count = models.PositiveIntegerField(default=0)
+
+    objects = TagQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Case-insensitive prefix lookups for suggestions
+            models.Index(Lower('name'), name='blog_tag_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -117,6 +254,58 @@ class Tag(models.Model):
 
 
 
+# BLOG QUERYSET
+class BlogQuerySet(models.QuerySet):
+    """Reusable query helpers for Blog lists"""
+
+    def published(self):
+        """Only blogs that are not drafts"""
+        return self.filter(is_published=True)
+
+    def without_body(self):
+        """Leave the body columns out of the SELECT: cards show title, excerpt and image"""
+        return self.defer(*Blog.BODY_FIELDS)
+
+    def visible_to(self, user):
+        """
+        Blogs whose author's profile visibility lets `user` see them:
+        public → everyone, followers → the author and approved followers,
+        private → the author only. Resolved in SQL with a single EXISTS
+        subquery against Follow instead of one query per post.
+        """
+        visible = Q(author__profile_visibility='public')
+
+        if user is not None and user.is_authenticated:
+            approved_follow = Follow.objects.filter(
+                follower=user,
+                following=OuterRef('author__user'),
+                is_approved=True
+            )
+            visible |= Q(author__user=user)
+            visible |= Q(author__profile_visibility='followers') & Exists(approved_follow)
+
+        return self.filter(visible)
+
+    def readable_by(self, user):
+        """Blogs `user` may open: visible to them and published, or their own drafts"""
+        return self.visible_to(user).filter(Q(is_published=True) | Q(author__user=user))
+
+    def _stat_subqueries(self):
+        """Correlated COUNT(*) subqueries for likes and comments of each blog row"""
+        return count_subquery(Like.objects.all(), 'blog'), count_subquery(Comment.objects.all(), 'blog')
+
+    def with_actual_stats(self):
+        """Annotate the true like/comment totals counted from the Like and Comment tables"""
+        actual_likes, actual_comments = self._stat_subqueries()
+        return self.annotate(actual_likes=actual_likes, actual_comments=actual_comments)
+
+    def recount_stats(self):
+        """Rewrite the denormalized like_count / comment_count columns from the source tables"""
+        actual_likes, actual_comments = self._stat_subqueries()
+        return self.update(like_count=actual_likes, comment_count=actual_comments)
+
+
+
 # BLOG MODEL
 class Blog(models.Model):
     """Main blog post model with content, metadata, and engagement tracking"""
@@ -141,9 +330,18 @@ class Blog(models.Model):
     tags = models.ManyToManyField(Tag, blank=True, related_name='blogs')
     
     # Media
-    image = models.ImageField(upload_to='blogs/', blank=True, null=True)
+    image = models.ImageField(upload_to='blogs/', storage=media_storage, blank=True, null=True, db_index=True)
+    # Resized copies of image and its loading placeholder (see blog.images)
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_placeholder = models.JSONField(default=dict, blank=True)
     excerpt = models.CharField(max_length=300, blank=True)
     content = models.TextField()
+
+    # Rendered from content on save (see blog.rendering)
+    content_html = models.TextField(blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveSmallIntegerField(default=1)  # minutes
+    content_version = models.PositiveSmallIntegerField(default=0)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -151,32 +349,63 @@ class Blog(models.Model):
     is_published = models.BooleanField(default=True)
     views = models.PositiveIntegerField(default=0)
 
+    # Denormalized counters (kept in sync with F() updates, repaired by `manage.py recount_blog_stats`)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    objects = BlogQuerySet.as_manager()
+
+    # Columns holding the post body, loaded only when the post itself is shown
+    BODY_FIELDS = ('content', 'content_html')
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: feed / profile (created_at, id)
+            models.Index(fields=['is_published', '-created_at', '-id']),
+            models.Index(fields=['author', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        """Auto-generate slug from title if not provided"""
+        """Auto-generate slug from title if not provided, and render the body"""
         if not self.slug:
             self.slug = slugify(self.title)
+        self.render_content()
         super().save(*args, **kwargs)
 
-    @property
-    def like_count(self):
-        """Count of likes for this blog post"""
-        return self.likes.count()
+    def render_content(self):
+        """Fill content_html, word_count, reading_time and an empty excerpt from content"""
+        self.content_html = render_content(self.content)
+        self.word_count = count_words(self.content)
+        self.reading_time = reading_minutes(self.word_count)
+        if not (self.excerpt or '').strip():
+            self.excerpt = make_excerpt(self.content)
+        self.content_version = CONTENT_RENDERER_VERSION
 
-    @property
-    def comment_count(self):
-        """Count of comments for this blog post"""
-        return self.comments.count()
-    
     @property
     def view_count(self):
         """Count of views for this blog post"""
-        return self.views.count()
+        return self.views
+
+
+
+# COMMENT QUERYSET
+class CommentQuerySet(models.QuerySet):
+    """Reusable query helpers for comment threads"""
+
+    def approved(self):
+        return self.filter(is_approved=True)
+
+    def _reply_count_subquery(self):
+        """Correlated COUNT(*) of approved direct replies of each comment row"""
+        return count_subquery(Comment.objects.filter(is_approved=True), 'parent')
+
+    def recount_replies(self):
+        """Rewrite the denormalized reply_count column from the Comment table"""
+        return self.update(reply_count=self._reply_count_subquery())
 
 
 
@@ -208,8 +437,18 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=True)
 
+    # Approved direct replies, so threads can offer "View N replies" without counting
+    reply_count = models.PositiveIntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']  # Chronological order for better thread display
+        indexes = [
+            # Keyset pagination: top-level comments of a blog, replies of a comment
+            models.Index(fields=['blog', 'parent', 'created_at', 'id']),
+            models.Index(fields=['parent', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f'{self.user.username} on {self.blog.title}'
@@ -244,6 +483,10 @@ class Like(models.Model):
     class Meta:
         unique_together = ('user', 'blog')  # Prevent duplicate likes
         ordering = ['-created_at']
+        indexes = [
+            # Grouped like notifications count a post's likes since a time
+            models.Index(fields=['blog', 'created_at']),
+        ]
 
     def __str__(self):
         return f'{self.user.username} liked {self.blog.title}'
@@ -350,10 +593,168 @@ class Follow(models.Model):
     class Meta:
         unique_together = ('follower', 'following')  # Prevent duplicate follows
         ordering = ['-created_at']
+        indexes = [
+            # Follow-request inbox: pending requests to a user, newest first
+            models.Index(fields=['following', 'is_approved', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.follower.username} → {self.following.username}"
 
+    def approve(self):
+        """
+        Approve this pending request and count it. The flip is a conditional
+        UPDATE, so of two concurrent approvals only one adjusts the counters.
+        Returns False if the request was no longer pending.
+        """
+        with transaction.atomic():
+            approved = Follow.objects.filter(pk=self.pk, is_approved=False).update(is_approved=True)
+            if approved:
+                Follow.adjust_counts(self.follower_id, self.following_id, +1)
+        self.is_approved = True
+        return bool(approved)
+
+    @staticmethod
+    def adjust_counts(follower_id, following_id, delta):
+        """
+        Add `delta` to the profile counters on both ends of an approved follow.
+        Call inside the transaction that creates, approves or deletes the edge.
+        """
+        Profile.objects.filter(user_id=follower_id).update(following_count=F('following_count') + delta)
+        Profile.objects.filter(user_id=following_id).update(followers_count=F('followers_count') + delta)
+
+    @staticmethod
+    def adjust_counts_for_followers(follower_ids, following_id, delta):
+        """`adjust_counts` for many followers of one user (e.g. requests approved in bulk)"""
+        follower_ids = list(follower_ids)
+        Profile.objects.filter(user_id__in=follower_ids).update(following_count=F('following_count') + delta)
+        Profile.objects.filter(user_id=following_id).update(
+            followers_count=F('followers_count') + delta * len(follower_ids)
+        )
+
+
+# TIMELINE ENTRY MODEL
+class TimelineEntry(models.Model):
+    """
+    Materialized "Following" feed: one row per (reader, post) written when the
+    post is published (fan-out-on-write). `created_at` is copied from the blog
+    so a timeline page is a single range scan on (user, created_at).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    blog = models.ForeignKey(
+        Blog,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'blog')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-blog']),
+        ]
+
+    def __str__(self):
+        return f"{self.blog.title} in {self.user.username}'s timeline"
+
+
+# TRENDING SCORE MODEL
+class TrendingScore(models.Model):
+    """
+    Precomputed time-decayed "hot" score of a published blog within one trending
+    window, maintained by `manage.py compute_trending`. The counters the score was
+    computed from are kept so the command only rescores posts with new activity.
+    """
+
+    WINDOW_CHOICES = [
+        ('today', 'Today'),
+        ('week', 'This Week'),
+        ('month', 'This Month'),
+        ('all', 'All Time'),
+    ]
+
+    blog = models.ForeignKey(
+        Blog,
+        on_delete=models.CASCADE,
+        related_name='trending_scores'
+    )
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    score = models.FloatField()
+
+    # Snapshot of the inputs, copied from the blog
+    created_at = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('blog', 'window')
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['window', '-score', '-blog']),
+            models.Index(fields=['window', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.blog.title} ({self.window}): {self.score:.4f}"
+
+
+# NOTIFICATION QUERYSET
+# Cached unread badge counts (see blog.notifications.unread_count)
+UNREAD_COUNT_CACHE_SECONDS = 60
+
+
+def unread_count_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def forget_unread_counts(user_ids):
+    """Drop the cached unread counts of these users once the current transaction commits"""
+    keys = [unread_count_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class NotificationQuerySet(models.QuerySet):
+    """
+    Every write through the queryset (and Notification.save/delete) drops the
+    cached unread counts of the recipients it touches. Deletes cascading from
+    posts, comments, follows and users stay fast deletes that bypass this, so
+    cached counts also expire after UNREAD_COUNT_CACHE_SECONDS.
+    """
+
+    def _recipient_ids(self):
+        return list(self.order_by().values_list('recipient_id', flat=True).distinct())
+
+    def update(self, **kwargs):
+        recipient_ids = self._recipient_ids()
+        rows = super().update(**kwargs)
+        forget_unread_counts(recipient_ids)
+        return rows
+
+    def delete(self):
+        recipient_ids = self._recipient_ids()
+        deleted = super().delete()
+        forget_unread_counts(recipient_ids)
+        return deleted
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        forget_unread_counts(obj.recipient_id for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        forget_unread_counts(obj.recipient_id for obj in objs)
+        return rows
+
 
 # =============================================================================
 # NOTIFICATION MODEL
@@ -408,12 +809,130 @@ class Notification(models.Model):
         blank=True
     )
     
-    # Status & Timestamps
+    # Grouped likes/follows (see blog.notifications): one row per
+    # (recipient, type, post, day) naming the latest sender and how many acted
+    group_key = models.CharField(max_length=100, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    # Status & Timestamps (a group's created_at moves to its latest activity)
     created_at = models.DateTimeField(default=timezone.now)
     is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id']),
+        ]
+        constraints = [
+            # A blog is announced as trending to its author at most once
+            models.UniqueConstraint(
+                fields=['recipient', 'blog'],
+                condition=Q(notification_type='trending'),
+                name='unique_trending_notification',
+            ),
+            models.UniqueConstraint(
+                fields=['recipient', 'group_key'],
+                condition=~Q(group_key=''),
+                name='unique_notification_group',
+            ),
+        ]
+
+    objects = NotificationQuerySet.as_manager()
+
+    @property
+    def other_actors(self):
+        """Senders of a grouped notification besides the one named"""
+        return self.actor_count - 1
 
     def __str__(self):
-        return f"Notification to {self.recipient.username} - {self.notification_type}"
\ No newline at end of file
+        return f"Notification to {self.recipient.username} - {self.notification_type}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        forget_unread_counts([self.recipient_id])
+
+    def delete(self, *args, **kwargs):
+        forget_unread_counts([self.recipient_id])
+        return super().delete(*args, **kwargs)
+
+
+# MEDIA FILE QUERYSET
+class MediaFileQuerySet(models.QuerySet):
+    def _reference_subquery(self):
+        """Correlated count of the Blog and Profile rows using each file"""
+        blogs = count_subquery(Blog.objects.all(), 'image', 'name')
+        profiles = count_subquery(Profile.objects.all(), 'profile_picture', 'name')
+        return blogs + profiles
+
+    def with_actual_references(self):
+        return self.annotate(actual_references=self._reference_subquery())
+
+    def recount_references(self):
+        """Rewrite ref_count from the Blog and Profile tables (repair)"""
+        return self.update(ref_count=self._reference_subquery())
+
+
+# MEDIA FILE MODEL
+class MediaFile(models.Model):
+    """
+    An uploaded image and the number of Blog/Profile rows referencing it, so
+    content-addressed files (see blog.storage) shared by several rows are
+    deleted only with the last of them.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = MediaFileQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @staticmethod
+    def acquire(names):
+        """Count one more reference per occurrence of each name in `names`"""
+        counts = Counter(name for name in names if name)
+        if not counts:
+            return
+        MediaFile.objects.bulk_create(
+            [MediaFile(name=name) for name in counts], ignore_conflicts=True
+        )
+        names_by_count = {}
+        for name, count in counts.items():
+            names_by_count.setdefault(count, []).append(name)
+        for count, names in names_by_count.items():
+            MediaFile.objects.filter(name__in=names).update(ref_count=F('ref_count') + count)
+
+    @staticmethod
+    def release(name):
+        """
+        Drop one reference to `name`. When it was the last, the file and its
+        variants are deleted after the transaction commits.
+        """
+        if not name:
+            return
+        MediaFile.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        transaction.on_commit(lambda: MediaFile.collect([name]))
+
+    @staticmethod
+    def collect(names=None):
+        """
+        Delete unreferenced files (of `names`, or all of them), their variants
+        and their rows. Returns the number of files deleted.
+        """
+        storage = media_storage()
+        orphans = MediaFile.objects.filter(ref_count=0)
+        if names is not None:
+            orphans = orphans.filter(name__in=names)
+
+        deleted = 0
+        for name in orphans.values_list('name', flat=True):
+            with transaction.atomic():
+                # Re-check under the row lock: an upload of the same bytes may have revived it
+                if not MediaFile.objects.select_for_update().filter(name=name, ref_count=0).delete()[0]:
+                    continue
+                # Variant names come from the original's bytes: list them before it goes
+                for path in [*stored_variants(name, storage), name]:
+                    storage.delete(path)
+            deleted += 1
+        return deleted
@@ -0,0 +1,104 @@
+"""
+Grouped like and follow notifications, the header dropdown and unread counts.
+
+Instead of a row per event, likes and follows are coalesced into one row per
+(recipient, type, post, UTC day) that is updated in place: "alice and 41
+others liked X". The row names the latest sender and carries the number of
+people who acted, counted from that day's Like / Follow rows, so unlike/re-like
+and unfollow/re-follow toggles never count anyone twice. Anyone other than the
+named sender brings the group back to the top as unread, even when the count
+did not grow (someone unliked before they liked); the named sender toggling
+again does not.
+
+The header dropdown is fetched when the bell is opened and lists only the
+latest DROPDOWN_SIZE notifications. The unread badge is served from a
+per-user count in the shared cache, which NotificationQuerySet drops whenever
+the user's notifications are written.
+"""
+from datetime import timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import UNREAD_COUNT_CACHE_SECONDS, Follow, Like, Notification, unread_count_key
+
+# Types coalesced into groups; comments, replies and follow requests stay one per event
+GROUPED_TYPES = ('like', 'follow')
+
+# Notifications listed in the header dropdown; the rest are on the notifications page
+DROPDOWN_SIZE = 10
+
+def unread_count(user):
+    """Number of unread notifications of `user` (cached)"""
+    return cache.get_or_set(
+        unread_count_key(user.pk),
+        lambda: Notification.objects.filter(recipient=user, is_read=False).count(),
+        UNREAD_COUNT_CACHE_SECONDS,
+    )
+
+
+def latest_notifications(user):
+    """The notifications shown in the header dropdown, with what the items render"""
+    return (
+        Notification.objects.filter(recipient=user)
+        .select_related('sender__profile', 'recipient__profile', 'blog', 'comment', 'follow')
+        .order_by('-created_at', '-id')[:DROPDOWN_SIZE]
+    )
+
+
+def group_start(now=None):
+    """Start of the (UTC day) group that `now` falls in"""
+    now = (now or timezone.now()).astimezone(dt_timezone.utc)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def group_key(notification_type, blog_id, start):
+    return f"{notification_type}:{blog_id or ''}:{start.date().isoformat()}"
+
+
+def _actor_count(recipient, notification_type, blog, since):
+    if notification_type == 'like':
+        return Like.objects.filter(blog=blog, created_at__gte=since).exclude(user=recipient).count()
+    return Follow.objects.filter(following=recipient, is_approved=True, created_at__gte=since).count()
+
+
+def notify_grouped(recipient, sender, notification_type, blog=None):
+    """
+    Record that `sender` liked `blog` / followed `recipient`, creating or
+    updating the day's group. Call after the Like / Follow row is written.
+    """
+    now = timezone.now()
+    start = group_start(now)
+    key = group_key(notification_type, blog.pk if blog else None, start)
+    actors = _actor_count(recipient, notification_type, blog, start)
+    if not actors:
+        return None
+
+    group = Notification.objects.filter(recipient=recipient, group_key=key).first()
+    if group is None:
+        try:
+            with transaction.atomic():
+                return Notification.objects.create(
+                    recipient=recipient,
+                    sender=sender,
+                    notification_type=notification_type,
+                    blog=blog,
+                    message='',
+                    group_key=key,
+                    actor_count=actors,
+                    created_at=now,
+                )
+        except IntegrityError:
+            # Created by a concurrent request
+            group = Notification.objects.get(recipient=recipient, group_key=key)
+
+    if sender.pk != group.sender_id:
+        # A new actor: name them and surface the group again
+        Notification.objects.filter(pk=group.pk).update(
+            sender=sender, actor_count=Greatest('actor_count', actors), created_at=now, is_read=False
+        )
+    elif actors > group.actor_count:
+        Notification.objects.filter(pk=group.pk, actor_count__lt=actors).update(actor_count=actors)
+    return group
@@ -0,0 +1,171 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+Instead of OFFSET, each page remembers the sort key of its last row and the
+next page asks for rows strictly "after" it, e.g. for ('-created_at', '-id'):
+
+    WHERE created_at < :c OR (created_at = :c AND id < :i) LIMIT n + 1
+
+so page cost stays constant however deep the user scrolls.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+
+PAGE_SIZE = 20
+COMMENTS_PAGE_SIZE = 20
+REPLIES_PAGE_SIZE = 10
+
+# Sort keys used by the list views (last key must be unique)
+NEWEST_FIRST = ('-created_at', '-id')
+OLDEST_FIRST = ('created_at', 'id')
+TRENDING_ORDER = ('-score', '-blog_id')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the given ordering"""
+
+
+def encode_cursor(values):
+    """Pack sort-key values into an opaque URL-safe token"""
+    raw = json.dumps(values, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Reverse of encode_cursor()"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage:
+    """One page of results plus the cursor pointing at the next one"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by a fixed tuple of sort keys, e.g.
+    KeysetPaginator(qs, ('-created_at', '-id')).page(cursor).
+    """
+
+    def __init__(self, queryset, ordering, per_page=PAGE_SIZE):
+        self.ordering = tuple(ordering)
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(decode_cursor(cursor)))
+
+        # Fetch one extra row to know whether another page exists
+        items = list(queryset[:self.per_page + 1])
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            return KeysetPage(items, encode_cursor(self._key(items[-1])))
+        return KeysetPage(items, None)
+
+    def _key(self, obj):
+        """Sort-key values of a row, following `a__b` paths"""
+        values = []
+        for key in self.ordering:
+            value = obj
+            for attr in key.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _field(self, path):
+        """Model field a sort key such as `blog__created_at` refers to"""
+        model = self.queryset.model
+        for attr in path.split('__'):
+            field = model._meta.get_field(attr)
+            model = field.related_model
+        return field
+
+    def _parse(self, values):
+        """
+        Cursor values converted by their fields. A cursor is client input, so
+        anything a field would reject (or a null) is an InvalidCursor, not a 500.
+        """
+        if len(values) != len(self.ordering):
+            raise InvalidCursor(values)
+        parsed = []
+        for key, value in zip(self.ordering, values):
+            if value is None or isinstance(value, (list, dict)):
+                raise InvalidCursor(values)
+            try:
+                parsed.append(self._field(key.lstrip('-')).to_python(value))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor(values)
+        return parsed
+
+    def _after(self, values):
+        """Row-value comparison `(k1, k2, ...) > (v1, v2, ...)` expanded into Q objects"""
+        values = self._parse(values)
+
+        condition = Q()
+        equal_so_far = Q()
+        for key, value in zip(self.ordering, values):
+            field = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{field}__{lookup}': value})
+            equal_so_far &= Q(**{field: value})
+        return condition
+
+
+def paginate(request, queryset, ordering, per_page=PAGE_SIZE):
+    """Return the page selected by `?cursor=`; a bad cursor is a 404 like Django's Paginator"""
+    try:
+        return KeysetPaginator(queryset, ordering, per_page).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+
+
+def wants_next_page(request):
+    """Infinite-scroll requests are AJAX calls carrying a cursor"""
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        and 'cursor' in request.GET
+    )
+
+
+def page_json(request, page, template_name, item_name, extra_context=None):
+    """JSON payload for infinite scroll: rendered items + cursor for the next page"""
+    extra_context = extra_context or {}
+    html = ''.join(
+        render_to_string(template_name, {item_name: item, **extra_context}, request=request)
+        for item in page
+    )
+    return JsonResponse({
+        'html': html,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    })
@@ -0,0 +1,311 @@
+"""
+Full-text search over blog posts.
+
+The index lives next to the Blog table and is built in SQL from the title,
+tags, category, excerpt and content of each post:
+
+* SQLite: an FTS5 virtual table ranked with BM25. FTS5 rows are keyed by an
+  integer rowid, so `blog_search_map` maps those rowids to blog UUIDs.
+* PostgreSQL: a weighted tsvector per post with a GIN index, ranked with
+  ts_rank_cd (Postgres has no built-in BM25).
+
+Other databases fall back to unranked icontains matching. The index is kept in
+sync by the signal handlers in `blog.signals` and can be rebuilt from scratch
+with `manage.py rebuild_search_index`.
+"""
+import re
+import uuid
+from bisect import bisect_right
+
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from .models import Blog
+from .pagination import PAGE_SIZE, InvalidCursor, KeysetPage, decode_cursor, encode_cursor
+
+# Ranked matches considered per query; deeper pages than this are not served
+SEARCH_MAX_RESULTS = 1000
+
+# Posts re-indexed per statement (keeps IN lists under SQLite's parameter limit)
+INDEX_BATCH_SIZE = 500
+
+
+class SQLiteSearchBackend:
+    """FTS5 index with BM25 ranking"""
+
+    # Column weights for bm25(): title, tags, category, excerpt, content
+    WEIGHTS = (10.0, 4.0, 4.0, 2.0, 1.0)
+
+    DOCUMENT_SQL = """
+        INSERT INTO blog_search (rowid, title, tags, category, excerpt, content)
+        SELECT m.docid, b.title,
+               COALESCE((SELECT group_concat(t.name, ' ')
+                         FROM blog_tag t JOIN blog_blog_tags bt ON bt.tag_id = t.id
+                         WHERE bt.blog_id = b.id), ''),
+               COALESCE(c.name, ''), b.excerpt, b.content
+        FROM blog_blog b
+        JOIN blog_search_map m ON m.blog_id = b.id
+        LEFT JOIN blog_category c ON c.id = b.category_id
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS blog_search USING fts5("
+                "title, tags, category, excerpt, content, "
+                "tokenize = 'porter unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS blog_search_map ("
+                "docid INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "blog_id char(32) NOT NULL UNIQUE)"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS blog_search")
+            cursor.execute("DROP TABLE IF EXISTS blog_search_map")
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM blog_search")
+            cursor.execute("DELETE FROM blog_search_map")
+            cursor.execute("INSERT INTO blog_search_map (blog_id) SELECT id FROM blog_blog")
+            cursor.execute(self.DOCUMENT_SQL)
+            cursor.execute("INSERT INTO blog_search (blog_search) VALUES ('optimize')")
+
+    def reindex(self, blog_ids):
+        ids, placeholders = _db_ids(blog_ids, self.connection)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR IGNORE INTO blog_search_map (blog_id) "
+                f"SELECT id FROM blog_blog WHERE id IN ({placeholders})",
+                ids,
+            )
+            cursor.execute(
+                f"DELETE FROM blog_search WHERE rowid IN "
+                f"(SELECT docid FROM blog_search_map WHERE blog_id IN ({placeholders}))",
+                ids,
+            )
+            cursor.execute(f"{self.DOCUMENT_SQL} WHERE b.id IN ({placeholders})", ids)
+
+    def remove(self, blog_ids):
+        ids, placeholders = _db_ids(blog_ids, self.connection)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM blog_search WHERE rowid IN "
+                f"(SELECT docid FROM blog_search_map WHERE blog_id IN ({placeholders}))",
+                ids,
+            )
+            cursor.execute(f"DELETE FROM blog_search_map WHERE blog_id IN ({placeholders})", ids)
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        bm25 = f"bm25(blog_search, {', '.join(str(w) for w in self.WEIGHTS)})"
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT m.blog_id, {bm25} FROM blog_search "
+                f"JOIN blog_search_map m ON m.docid = blog_search.rowid "
+                f"WHERE blog_search MATCH %s ORDER BY {bm25} LIMIT %s",
+                [match, limit],
+            )
+            # bm25() is lower-is-better; flip it so every backend sorts by score descending
+            return [(uuid.UUID(blog_id), -score) for blog_id, score in cursor.fetchall()]
+
+    @staticmethod
+    def match_expression(query):
+        """
+        User input as an FTS5 query where every word must match. Words are quoted
+        so FTS5 operators in the input are ignored, and not prefix-expanded: prefix
+        queries over a large index cost far more than exact (stemmed) terms.
+        """
+        words = re.findall(r'\w+', query)
+        return ' '.join('"%s"' % word.replace('"', '""') for word in words)
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector + GIN index with ts_rank_cd ranking"""
+
+    DOCUMENT_SQL = """
+        INSERT INTO blog_search (blog_id, document)
+        SELECT b.id,
+               setweight(to_tsvector('english', b.title), 'A') ||
+               setweight(to_tsvector('english',
+                   COALESCE((SELECT string_agg(t.name, ' ')
+                             FROM blog_tag t JOIN blog_blog_tags bt ON bt.tag_id = t.id
+                             WHERE bt.blog_id = b.id), '') || ' ' || COALESCE(c.name, '')), 'B') ||
+               setweight(to_tsvector('english', b.excerpt), 'C') ||
+               setweight(to_tsvector('english', b.content), 'D')
+        FROM blog_blog b
+        LEFT JOIN blog_category c ON c.id = b.category_id
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS blog_search ("
+                "blog_id uuid PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS blog_search_document_idx "
+                "ON blog_search USING GIN (document)"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS blog_search")
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("TRUNCATE blog_search")
+            cursor.execute(self.DOCUMENT_SQL)
+
+    def reindex(self, blog_ids):
+        ids, placeholders = _db_ids(blog_ids, self.connection)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"{self.DOCUMENT_SQL} WHERE b.id IN ({placeholders}) "
+                f"ON CONFLICT (blog_id) DO UPDATE SET document = EXCLUDED.document",
+                ids,
+            )
+
+    def remove(self, blog_ids):
+        ids, placeholders = _db_ids(blog_ids, self.connection)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM blog_search WHERE blog_id IN ({placeholders})", ids)
+
+    def search(self, query, limit):
+        if not query.strip():
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT blog_id, ts_rank_cd(document, query, 32) AS score "
+                "FROM blog_search, websearch_to_tsquery('english', %s) query "
+                "WHERE document @@ query ORDER BY score DESC LIMIT %s",
+                [query, limit],
+            )
+            return [(uuid.UUID(str(blog_id)), score) for blog_id, score in cursor.fetchall()]
+
+
+class FallbackSearchBackend:
+    """Unranked icontains matching for databases without a full-text engine"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def reindex(self, blog_ids):
+        pass
+
+    def remove(self, blog_ids):
+        pass
+
+    def search(self, query, limit):
+        if not query.strip():
+            return []
+        matches = Blog.objects.filter(
+            Q(title__icontains=query) | Q(excerpt__icontains=query) | Q(content__icontains=query)
+        )
+        return [(blog_id, 0.0) for blog_id in matches.values_list('id', flat=True)[:limit]]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def search_backend(connection=None):
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)(connection)
+
+
+def _db_ids(blog_ids, connection):
+    """Blog primary keys as database values, plus matching %s placeholders"""
+    ids = [Blog._meta.pk.get_db_prep_value(blog_id, connection) for blog_id in blog_ids]
+    return ids, ', '.join(['%s'] * len(ids))
+
+
+def _chunks(blog_ids):
+    blog_ids = list(blog_ids or [])
+    for start in range(0, len(blog_ids), INDEX_BATCH_SIZE):
+        yield blog_ids[start:start + INDEX_BATCH_SIZE]
+
+
+def index_blogs(blog_ids):
+    """(Re)build the documents of the given posts"""
+    backend = search_backend()
+    for chunk in _chunks(blog_ids):
+        backend.reindex(chunk)
+
+
+def unindex_blogs(blog_ids):
+    backend = search_backend()
+    for chunk in _chunks(blog_ids):
+        backend.remove(chunk)
+
+
+def matching_ids(query, limit=SEARCH_MAX_RESULTS):
+    """IDs of posts matching `query`, best match first"""
+    return [blog_id for blog_id, _ in search_backend().search(query, limit)]
+
+
+def search_page(query, user, cursor=None, per_page=PAGE_SIZE):
+    """
+    One page of published posts visible to `user` that match `query`, best first.
+    The cursor is the (score, id) of the last post shown.
+    """
+    ranked = search_backend().search(query, SEARCH_MAX_RESULTS)
+    ranked.sort(key=lambda match: (-match[1], str(match[0])))
+    keys = [(-score, str(blog_id)) for blog_id, score in ranked]
+
+    position = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            score, blog_id = float(values[0]), str(uuid.UUID(values[1]))
+        except (ValueError, TypeError, IndexError, AttributeError):
+            raise InvalidCursor(cursor)
+        position = bisect_right(keys, (-score, blog_id))
+
+    visible = (
+        Blog.objects.published()
+        .visible_to(user)
+        .without_body()
+        .select_related('author', 'author__user', 'category')
+        .prefetch_related('tags')
+    )
+
+    # Walk the ranked ids in chunks, keeping the ones this user may see
+    matches = []
+    while position < len(ranked) and len(matches) <= per_page:
+        chunk = ranked[position:position + per_page + 1]
+        blogs = visible.in_bulk([blog_id for blog_id, _ in chunk])
+        for blog_id, score in chunk:
+            position += 1
+            if blog_id in blogs:
+                matches.append((score, blogs[blog_id]))
+                if len(matches) > per_page:
+                    break
+
+    if len(matches) > per_page:
+        matches = matches[:per_page]
+        last_score, last_blog = matches[-1]
+        return KeysetPage([blog for _, blog in matches], encode_cursor([last_score, str(last_blog.id)]))
+    return KeysetPage([blog for _, blog in matches], None)
@@ -0,0 +1,159 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .images import BLOG_IMAGE, PROFILE_PICTURE, schedule_variants
+from .models import Blog, Category, MediaFile, Profile, Tag
+from .search import index_blogs, unindex_blogs
+from .user_search import index_users, unindex_users
+from .vocabulary import bump_vocabulary_version
+
+
+# SEARCH INDEX SYNC
+@receiver(post_save, sender=Blog)
+def index_saved_blog(sender, instance, raw=False, **kwargs):
+    """Re-index a post whenever it is saved"""
+    if not raw:
+        index_blogs([instance.pk])
+
+
+@receiver(post_delete, sender=Blog)
+def unindex_deleted_blog(sender, instance, **kwargs):
+    unindex_blogs([instance.pk])
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def index_retagged_blog(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tags are indexed too, and are set after the post is saved"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_blogs([instance.pk])
+        return
+
+    # Changed from the Tag side: `pk_set` holds blog ids, except for a clear
+    if action == 'pre_clear':
+        instance._cleared_blog_ids = list(instance.blogs.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        index_blogs(getattr(instance, '_cleared_blog_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        index_blogs(pk_set)
+
+
+@receiver(post_save, sender=Category)
+def index_renamed_category(sender, instance, created, raw=False, **kwargs):
+    """The category name is part of each post's document"""
+    if not created and not raw:
+        index_blogs(list(instance.blogs.values_list('pk', flat=True)))
+
+
+# USER SEARCH INDEX SYNC
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def index_saved_user(sender, instance, raw=False, **kwargs):
+    """Username lives on User, the display name on Profile"""
+    if not raw:
+        index_users([instance.pk if sender is User else instance.user_id])
+
+
+@receiver(post_delete, sender=User)
+def unindex_deleted_user(sender, instance, **kwargs):
+    unindex_users([instance.pk])
+
+
+# VOCABULARY VERSIONS
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def bump_changed_vocabulary(sender, **kwargs):
+    """Invalidate cached suggestion responses (ETags) for this model"""
+    bump_vocabulary_version(sender)
+
+
+# VOCABULARY USAGE COUNTS
+# (Tags set through tagging.set_blog_tags adjust their own counts.)
+@receiver(pre_save, sender=Blog)
+def remember_stored_category(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._stored_category_id = Blog.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Blog)
+def count_saved_category(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_id = None if created else getattr(instance, '_stored_category_id', None)
+    if instance.category_id != previous_id:
+        Category.objects.adjust_usage({instance.category_id: 1, previous_id: -1})
+
+
+@receiver(pre_delete, sender=Blog)
+def remember_deleted_tags(sender, instance, **kwargs):
+    """The post's tag links are deleted (without signals) before post_delete runs"""
+    instance._deleted_tag_ids = list(Blog.tags.through.objects.filter(blog_id=instance.pk).values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Blog)
+def uncount_deleted_blog(sender, instance, **kwargs):
+    Category.objects.adjust_usage({instance.category_id: -1})
+    Tag.objects.adjust_usage(dict.fromkeys(getattr(instance, '_deleted_tag_ids', []), -1))
+
+
+# IMAGE VARIANTS
+@receiver(post_save, sender=Blog)
+def render_blog_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, BLOG_IMAGE)
+
+
+@receiver(post_save, sender=Profile)
+def render_profile_picture_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, PROFILE_PICTURE)
+
+
+# MEDIA FILE REFERENCES
+# Image field of the models whose uploads are reference counted
+MEDIA_FIELDS = {
+    Blog: 'image',
+    Profile: 'profile_picture',
+}
+
+
+def _counted_name(sender, name):
+    """The file name a row references, or None (no file, or the shared default picture)"""
+    if not name or name == sender._meta.get_field(MEDIA_FIELDS[sender]).default:
+        return None
+    return name
+
+
+@receiver(pre_save, sender=Blog)
+@receiver(pre_save, sender=Profile)
+def remember_stored_media(sender, instance, raw=False, **kwargs):
+    """The file the row referenced before this save"""
+    if not raw and not instance._state.adding:
+        instance._stored_media = sender.objects.filter(pk=instance.pk).values_list(MEDIA_FIELDS[sender], flat=True).first()
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_save, sender=Profile)
+def count_saved_media(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_name = getattr(instance, '_stored_media', None)
+    instance._stored_media = None
+    name = getattr(instance, MEDIA_FIELDS[sender]).name
+    if name == previous_name:
+        return
+    MediaFile.acquire([_counted_name(sender, name)])
+    previous_name = _counted_name(sender, previous_name)
+    if previous_name:
+        MediaFile.release(previous_name)
+
+
+@receiver(post_delete, sender=Blog)
+@receiver(post_delete, sender=Profile)
+def release_deleted_media(sender, instance, **kwargs):
+    name = _counted_name(sender, getattr(instance, MEDIA_FIELDS[sender]).name)
+    if name:
+        MediaFile.release(name)
@@ -0,0 +1,36 @@
+// ====== COMMENT THREADS ======
+// Top-level comments and replies are paginated. "Load more comments" and
+// "View N replies" buttons carry the URL (and cursor) of the next page; a
+// click fetches it as JSON and appends the rendered comments to data-target.
+document.addEventListener("click", async (e) => {
+  const button = e.target.closest(".load-more-comments, .load-replies-btn");
+  if (!button || button.disabled) return;
+  e.preventDefault();
+
+  const container = document.querySelector(button.dataset.target);
+  const params = new URLSearchParams();
+  if (button.dataset.cursor) params.set("cursor", button.dataset.cursor);
+
+  button.disabled = true;
+  try {
+    const response = await fetch(`${button.dataset.url}?${params}`, {
+      headers: { "X-Requested-With": "XMLHttpRequest" },
+    });
+    const data = await response.json();
+
+    container.insertAdjacentHTML("beforeend", data.html);
+
+    if (data.has_next) {
+      button.dataset.cursor = data.next_cursor;
+      button.textContent = button.classList.contains("load-replies-btn")
+        ? "View more replies"
+        : "Load more comments";
+      button.disabled = false;
+    } else {
+      button.remove();
+    }
+  } catch (err) {
+    console.error("Failed to load comments:", err);
+    button.disabled = false;
+  }
+});
@@ -0,0 +1,48 @@
+// ====== INFINITE SCROLL ======
+// Keyset pagination: every [data-infinite-scroll] sentinel carries the cursor
+// of the next page. When it scrolls into view we fetch that page as JSON,
+// append the rendered items to its container and move the cursor forward.
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("[data-infinite-scroll]").forEach((sentinel) => {
+    const container = document.querySelector(sentinel.dataset.container);
+    const url = sentinel.dataset.url || window.location.pathname;
+    let loading = false;
+
+    const observer = new IntersectionObserver(
+      async (entries) => {
+        if (!entries[0].isIntersecting || loading) return;
+        loading = true;
+
+        const params = new URLSearchParams(window.location.search);
+        params.set("cursor", sentinel.dataset.nextCursor);
+
+        try {
+          const response = await fetch(`${url}?${params}`, {
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+          });
+          const data = await response.json();
+
+          container.insertAdjacentHTML("beforeend", data.html);
+          container.dispatchEvent(new CustomEvent("page:loaded", { bubbles: true }));
+
+          if (data.has_next) {
+            sentinel.dataset.nextCursor = data.next_cursor;
+            // Re-observe so a sentinel that is still visible fires again
+            observer.unobserve(sentinel);
+            observer.observe(sentinel);
+          } else {
+            observer.disconnect();
+            sentinel.remove();
+          }
+        } catch (err) {
+          console.error("Failed to load next page:", err);
+        } finally {
+          loading = false;
+        }
+      },
+      { rootMargin: "400px" }
+    );
+
+    observer.observe(sentinel);
+  });
+});
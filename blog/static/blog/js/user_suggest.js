@@ -0,0 +1,86 @@
+// ====== USER SUGGESTIONS ======
+// Search-as-you-type for the user search box. Requests are debounced, and a
+// request still in flight is aborted when the next keystroke arrives, so only
+// the latest query ever renders.
+document.addEventListener("DOMContentLoaded", () => {
+  const input = document.getElementById("searchInput");
+  const list = document.getElementById("userSuggestions");
+  if (!input || !list) return;
+
+  const DEBOUNCE_MS = 150;
+  const MIN_CHARS = 2;
+  let timer = null;
+  let controller = null;
+
+  function hide() {
+    list.hidden = true;
+    list.innerHTML = "";
+  }
+
+  function render(results) {
+    list.innerHTML = "";
+    results.forEach((user) => {
+      const item = document.createElement("li");
+      const link = document.createElement("a");
+      link.href = user.url;
+      link.className = "suggestion";
+
+      if (user.picture) {
+        const img = document.createElement("img");
+        img.src = user.picture;
+        img.alt = "";
+        img.className = "suggestion-avatar";
+        link.appendChild(img);
+      }
+
+      const name = document.createElement("span");
+      name.className = "suggestion-name";
+      name.textContent = user.name || user.username;
+      link.appendChild(name);
+
+      const username = document.createElement("span");
+      username.className = "suggestion-username";
+      username.textContent = `@${user.username}`;
+      link.appendChild(username);
+
+      item.appendChild(link);
+      list.appendChild(item);
+    });
+    list.hidden = results.length === 0;
+  }
+
+  async function fetchSuggestions(query) {
+    if (controller) controller.abort();
+    controller = new AbortController();
+
+    try {
+      const response = await fetch(
+        `${input.dataset.suggestUrl}?${new URLSearchParams({ q: query })}`,
+        { signal: controller.signal, headers: { "X-Requested-With": "XMLHttpRequest" } }
+      );
+      const data = await response.json();
+      if (input.value.trim() === query) render(data.results);
+    } catch (err) {
+      if (err.name !== "AbortError") console.error("Suggestion error:", err);
+    }
+  }
+
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    const query = input.value.trim();
+    if (query.length < MIN_CHARS) {
+      if (controller) controller.abort();
+      hide();
+      return;
+    }
+    timer = setTimeout(() => fetchSuggestions(query), DEBOUNCE_MS);
+  });
+
+  input.addEventListener("keydown", (e) => {
+    if (e.key === "Escape") hide();
+  });
+
+  document.addEventListener("click", (e) => {
+    if (!list.contains(e.target) && e.target !== input) hide();
+  });
+});
@@ -0,0 +1,33 @@
+// ====== TAG / CATEGORY SUGGESTIONS ======
+// Tagify whitelists are filled from the prefix-filtered suggestion endpoints
+// as the user types, instead of downloading the whole vocabulary up front.
+// Responses carry an ETag, so repeated prefixes are served by the browser cache.
+function attachSuggestions(tagify, url) {
+  const DEBOUNCE_MS = 150;
+  let timer = null;
+  let controller = null;
+
+  async function load(prefix) {
+    if (controller) controller.abort();
+    controller = new AbortController();
+
+    try {
+      const response = await fetch(`${url}?${new URLSearchParams({ q: prefix })}`, {
+        signal: controller.signal,
+      });
+      tagify.whitelist = await response.json();
+      if (prefix) tagify.dropdown.show(prefix);
+    } catch (err) {
+      if (err.name !== "AbortError") console.error("Suggestion error:", err);
+    }
+  }
+
+  tagify.on("input", (e) => {
+    clearTimeout(timer);
+    tagify.whitelist = null;
+    timer = setTimeout(() => load(e.detail.value.trim()), DEBOUNCE_MS);
+  });
+
+  // Most used entries for an empty input
+  load("");
+}
@@ -0,0 +1,85 @@
+"""
+Content-addressed storage for uploaded images.
+
+Files are named by the SHA-256 of their bytes and sharded into two levels of
+directories under the field's upload_to:
+
+    blogs/3f/a2/3fa2...c9.png
+
+so uploading the same image again references the existing file instead of
+writing a copy, and no directory grows past a few hundred entries. Rows
+referencing a file are counted by `MediaFile` (kept by the signal handlers in
+`blog.signals`); a file is deleted once nothing references it.
+"""
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_name(name, content):
+    """blogs/photo.JPG -> blogs/3f/a2/3fa2...c9.jpg"""
+    directory, filename = posixpath.split(name)
+    ext = posixpath.splitext(filename)[1].lower()
+    digest = content_hash(content)
+    return posixpath.join(directory, digest[:2], digest[2:4], digest + ext)
+
+
+def is_content_name(name):
+    """Whether `name` is laid out by ContentAddressedStorage (legacy uploads are not)"""
+    parts = name.split('/')
+    stem = posixpath.splitext(parts[-1])[0]
+    return (
+        len(parts) >= 3 and len(stem) == 64
+        and parts[-3] == stem[:2] and parts[-2] == stem[2:4]
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content and never stores a file twice"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(content_name(name, content), content, max_length=max_length)
+
+    def save_derived(self, name, content):
+        """
+        Save a file derived from a stored one (an image variant) under `name`
+        as given: derived names already carry a digest of the original's bytes.
+        """
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # The name identifies the content: an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name and move it into place, so two
+        # concurrent uploads of the same bytes both end with one complete file
+        temp_name = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+
+def media_storage():
+    """Storage of Blog.image and Profile.profile_picture"""
+    return ContentAddressedStorage()
@@ -0,0 +1,104 @@
+"""
+Tag sets for posts, resolved and attached in a constant number of queries.
+
+Tags are matched on their slug, so "Python" and "python" resolve to the same
+row instead of colliding on the unique slug. Missing tags are created with one
+bulk INSERT and post/tag links are written straight to the through table. Those
+bulk writes send no model or m2m signals, so the search index, tag usage counts
+and the tag suggestion version are refreshed here.
+"""
+import json
+from functools import lru_cache
+
+from django.utils.text import slugify
+
+from .models import Blog, Tag
+from .search import index_blogs
+from .vocabulary import bump_vocabulary_version
+
+BlogTag = Blog.tags.through
+
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def parse_tagify(raw):
+    """
+    Values posted by a Tagify input: a JSON list of {"value": ...} objects, or
+    a plain comma-separated string when JavaScript did not run.
+    """
+    try:
+        items = json.loads(raw or '[]')
+        values = [item['value'] for item in items]
+    except (json.JSONDecodeError, TypeError, KeyError):
+        values = (raw or '').split(',')
+    return [value.strip() for value in values if value and value.strip()]
+
+
+@lru_cache(maxsize=10000)
+def tag_slug(name):
+    """The slug a tag name resolves to ('' for names that cannot be tags)"""
+    return slugify(name.strip()[:TAG_NAME_MAX_LENGTH])
+
+
+def tag_ids_by_slug(names):
+    """
+    {slug: tag id} for `names`, creating missing tags. At most three queries
+    however many names there are.
+    """
+    names_by_slug = {}
+    for name in names:
+        slug = tag_slug(name)
+        if slug:
+            names_by_slug.setdefault(slug, name.strip()[:TAG_NAME_MAX_LENGTH])
+    if not names_by_slug:
+        return {}
+
+    ids_by_slug = dict(Tag.objects.filter(slug__in=names_by_slug).values_list('slug', 'id'))
+    missing = [slug for slug in names_by_slug if slug not in ids_by_slug]
+    if missing:
+        # A concurrent request may create the same tags; ignore those rows and re-read
+        Tag.objects.bulk_create(
+            [Tag(name=names_by_slug[slug], slug=slug) for slug in missing],
+            ignore_conflicts=True,
+        )
+        ids_by_slug.update(Tag.objects.filter(slug__in=missing).values_list('slug', 'id'))
+        bump_vocabulary_version(Tag)
+    return ids_by_slug
+
+
+def resolve_tags(names):
+    """Tag IDs for `names` in order (duplicates and unsluggable names dropped)"""
+    ids_by_slug = tag_ids_by_slug(names)
+    ids = []
+    for name in names:
+        tag_id = ids_by_slug.get(tag_slug(name))
+        if tag_id is not None and tag_id not in ids:
+            ids.append(tag_id)
+    return ids
+
+
+def set_blog_tags(blog, names, created=False):
+    """
+    Make `names` the tags of `blog`, writing only the difference. Pass
+    `created=True` for a brand-new post to skip reading its (empty) tag set.
+    Returns (added, removed) counts.
+    """
+    wanted = set(resolve_tags(names))
+    current = set() if created else set(
+        BlogTag.objects.filter(blog=blog).values_list('tag_id', flat=True)
+    )
+
+    added = wanted - current
+    removed = current - wanted
+    if added:
+        BlogTag.objects.bulk_create(
+            [BlogTag(blog_id=blog.pk, tag_id=tag_id) for tag_id in added],
+            ignore_conflicts=True,
+        )
+    if removed:
+        BlogTag.objects.filter(blog=blog, tag_id__in=removed).delete()
+
+    if added or removed:
+        Tag.objects.adjust_usage({**dict.fromkeys(added, 1), **dict.fromkeys(removed, -1)})
+        index_blogs([blog.pk])
+    return len(added), len(removed)
@@ -0,0 +1,63 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(storage, variants):
+    return format_html_join(', ', '{} {}w', ((storage.url(name), width) for name, width in variants))
+
+
+def _placeholder_style(image, placeholder):
+    """Inline background showing the placeholder until the image has loaded"""
+    placeholder = placeholder or {}
+    if placeholder.get('source') != image.name:
+        return ''
+    return format_html(
+        ' style="background: {} url({}) center / cover no-repeat"',
+        placeholder['color'], placeholder['lqip'],
+    )
+
+
+@register.simple_tag
+def picture(image, variants, sizes, alt='', css_class='', placeholder=None):
+    """
+    <picture> with WebP and JPEG srcsets for an image field and its variants
+    (see blog.images), or a plain <img> of the upload while they are pending.
+    `sizes` is the rendered width, e.g. "36px" for an avatar. With a
+    `placeholder`, its color and blurred preview fill the box while loading.
+
+        {% picture blog.image blog.image_variants "(max-width: 640px) 100vw, 640px" alt=blog.title css_class="blog-image" placeholder=blog.image_placeholder %}
+    """
+    if not image:
+        return ''
+    style = _placeholder_style(image, placeholder)
+    variants = variants or {}
+    if variants.get('source') != image.name or not variants.get('jpg'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}"{} loading="lazy" decoding="async">',
+            image.url, alt, css_class, style,
+        )
+
+    # Browsers without srcset support get the card-sized JPEG
+    fallback = variants['jpg'][min(1, len(variants['jpg']) - 1)][0]
+    # display: contents keeps <picture> out of the layout, so CSS written for a bare <img> still applies
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}"{} loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(image.storage, variants.get('webp', [])), sizes,
+        image.storage.url(fallback), _srcset(image.storage, variants['jpg']), sizes, alt, css_class, style,
+    )
+
+
+@register.simple_tag
+def variant_url(image, variants):
+    """URL of the largest WebP variant of an image field, or of the upload itself"""
+    if not image:
+        return ''
+    variants = variants or {}
+    if variants.get('source') != image.name or not variants.get('webp'):
+        return image.url
+    return image.storage.url(variants['webp'][-1][0])
@@ -1,3 +1,954 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .images import (
+    BLOG_IMAGE, STORE_ATTEMPTS, _store_rendered, render_placeholder, render_variants, source_digest, store_placeholder,
+    store_variants, stored_variants, variant_name,
+)
+from .models import (
+    Blog, Category, Comment, Follow, Like, MediaFile, Notification, Profile, Tag, TimelineEntry, TrendingScore,
+)
+from .notifications import unread_count
+from .pagination import REPLIES_PAGE_SIZE, KeysetPaginator, NEWEST_FIRST, encode_cursor
+from .rendering import CONTENT_RENDERER_VERSION
+from .search import search_page
+from .tagging import set_blog_tags
+from .storage import is_content_name
+from .timeline import trim_timeline
+from .transfer import export_blogs, import_blogs
+from .trending import compute_trending, notify_trending
+from .unique_viewers import WINDOW_SECONDS, BloomFilter, is_new_viewer, viewer_key
+from .user_search import user_search_page
+from .view_counter import ViewCountBuffer
+from .viewer_state import viewer_state
+
+
+def make_user(username, visibility='public'):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    Profile.objects.create(user=user, name=username, profile_visibility=visibility)
+    return user
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice')
+        now = timezone.now()
+        for i in range(25):
+            blog = Blog.objects.create(author=self.user.profile, title=f'Post {i}', content='c', views=i % 4)
+            # Three posts per timestamp, so pages have to break ties on id
+            Blog.objects.filter(pk=blog.pk).update(created_at=now - timedelta(minutes=i // 3))
+
+    def walk(self, ordering, per_page=7):
+        seen, cursor = [], None
+        while True:
+            page = KeysetPaginator(Blog.objects.all(), ordering, per_page).page(cursor)
+            seen += [blog.pk for blog in page]
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_round_trip_matches_offset_order(self):
+        for ordering in (NEWEST_FIRST, ('-views', '-created_at', '-id')):
+            expected = list(Blog.objects.order_by(*ordering).values_list('pk', flat=True))
+            self.assertEqual(self.walk(ordering), expected)
+
+    def test_feed_pages_and_bad_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('blogs'))
+        cursor = response.context['blogs'].next_cursor
+        shown = len(response.context['blogs'])
+        while cursor:
+            data = self.client.get(reverse('blogs'), {'cursor': cursor}, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+            shown += data['html'].count('class="blog-card"')
+            cursor = data['next_cursor']
+        self.assertEqual(shown, 25)
+
+        response = self.client.get(reverse('blogs'), {'cursor': 'garbage!'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 404)
+
+    def test_type_invalid_cursors_are_404(self):
+        comment = Comment.objects.create(blog=Blog.objects.first(), user=self.user, content='c')
+        urls = [
+            reverse('blogs'), reverse('following_feed'), reverse('trending'), reverse('search_users'),
+            reverse('notifications'), reverse('load_comments', args=[comment.blog_id]),
+            reverse('load_replies', args=[comment.id]),
+        ]
+        cursors = [['x', 'y'], [None, None], ['2024-01-01', 'notauuid'], [[1], {'a': 1}], ['1', '2', '3'], {'a': 1}]
+        self.client.force_login(self.user)
+        for url in urls:
+            for values in cursors:
+                response = self.client.get(url, {'cursor': encode_cursor(values)}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                self.assertEqual(response.status_code, 404, (url, values))
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='c')
+
+    def test_like_and_comment_counters_follow_views_and_recount(self):
+        self.client.force_login(self.reader)
+        url = reverse('toggle_like', args=[self.blog.id])
+        self.assertEqual(self.client.post(url).json(), {'liked': True, 'like_count': 1})
+        self.assertEqual(self.client.post(url).json(), {'liked': False, 'like_count': 0})
+        self.client.post(url)
+        self.client.post(reverse('add_comment', args=[self.blog.id]), {'content': 'hi'})
+        self.blog.refresh_from_db()
+        self.assertEqual((self.blog.like_count, self.blog.comment_count), (1, 1))
+
+        Blog.objects.update(like_count=7, comment_count=0)
+        call_command('recount_blog_stats', dry_run=True, stdout=StringIO())
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 7)
+        call_command('recount_blog_stats', chunk_size=1, stdout=StringIO())
+        self.blog.refresh_from_db()
+        self.assertEqual((self.blog.like_count, self.blog.comment_count), (1, 1))
+
+    def test_follow_counters_follow_views_and_recount(self):
+        self.client.force_login(self.reader)
+        self.client.post(reverse('toggle_follow_ajax', args=['author']))
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.reader).following_count, 1)
+
+        Profile.objects.update(followers_count=5, following_count=5)
+        call_command('recount_follow_counts', chunk_size=1, stdout=StringIO())
+        counts = dict(Profile.objects.values_list('user__username', 'followers_count'))
+        self.assertEqual(counts, {'author': 1, 'reader': 0})
+
+        self.client.post(reverse('toggle_follow_ajax', args=['author']))
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 0)
+
+
+class GroupedNotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.first = make_user('first')
+        self.second = make_user('second')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='c')
+        self.like_url = reverse('toggle_like', args=[self.blog.id])
+
+    def like_as(self, user):
+        self.client.force_login(user)
+        self.client.post(self.like_url)
+
+    def group(self):
+        return Notification.objects.get(recipient=self.author, notification_type='like')
+
+    def test_toggling_does_not_duplicate_or_resurface(self):
+        self.like_as(self.first)
+        Notification.objects.update(is_read=True)
+        self.client.post(self.like_url)  # unlike
+        self.client.post(self.like_url)  # like again
+        group = self.group()
+        self.assertEqual(group.actor_count, 1)
+        self.assertTrue(group.is_read)
+
+    def test_new_actors_are_merged_and_named(self):
+        self.like_as(self.first)
+        Notification.objects.update(is_read=True)
+        self.like_as(self.second)
+        group = self.group()
+        self.assertEqual((group.sender, group.actor_count, group.is_read), (self.second, 2, False))
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 1)
+
+    def test_new_actor_resurfaces_group_when_count_is_unchanged(self):
+        self.like_as(self.first)
+        Notification.objects.update(is_read=True)
+        self.client.post(self.like_url)  # unlike
+        self.like_as(self.second)
+        group = self.group()
+        self.assertEqual((group.sender, group.actor_count, group.is_read), (self.second, 1, False))
+
+    def test_follows_are_grouped(self):
+        for user in (self.first, self.second):
+            self.client.force_login(user)
+            self.client.post(reverse('toggle_follow_ajax', args=['author']))
+        self.client.post(reverse('toggle_follow_ajax', args=['author']))  # unfollow
+        self.client.post(reverse('toggle_follow_ajax', args=['author']))  # follow again
+        group = Notification.objects.get(recipient=self.author, notification_type='follow')
+        self.assertEqual(group.actor_count, 2)
+
+
+class TrimTimelineTests(TestCase):
+    def test_keeps_exactly_the_newest_entries_across_timestamp_ties(self):
+        reader = make_user('reader')
+        author = make_user('author')
+        TimelineEntry.objects.all().delete()
+        now = timezone.now()
+        blogs = [Blog.objects.create(author=author.profile, title=f'Post {i}', content='c') for i in range(6)]
+        # A fan-out writes many entries with the same created_at
+        for i, blog in enumerate(blogs):
+            TimelineEntry.objects.create(user=reader, blog=blog, created_at=now if i < 4 else now - timedelta(hours=1))
+
+        feed = TimelineEntry.objects.filter(user=reader).order_by('-created_at', '-blog_id')
+        kept = list(feed.values_list('blog_id', flat=True)[:3])
+        self.assertEqual(trim_timeline(reader.id, keep=3), 3)
+        self.assertEqual(list(feed.values_list('blog_id', flat=True)), kept)
+        self.assertEqual(trim_timeline(reader.id, keep=3), 0)
+
+
+class TempMediaTestCase(TestCase):
+    """Uploads go to a temporary MEDIA_ROOT"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+
+@mock.patch('blog.signals.schedule_variants')
+class MediaStorageTests(TempMediaTestCase):
+    def setUp(self):
+        self.profile = make_user('alice').profile
+
+    def post(self, title, data, filename='photo.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Blog.objects.create(
+                author=self.profile, title=title, content='c',
+                image=SimpleUploadedFile(filename, data, 'image/png'),
+            )
+
+    def test_identical_uploads_share_one_counted_file(self, schedule_variants):
+        first = self.post('First', b'same bytes', 'Photo.PNG')
+        second = self.post('Second', b'same bytes', 'other.png')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_name(first.image.name))
+        self.assertEqual(MediaFile.objects.get(name=first.image.name).ref_count, 2)
+
+        path = first.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(MediaFile.objects.get(name=second.image.name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image = SimpleUploadedFile('new.png', b'new bytes', 'image/png')
+            second.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaFile.objects.filter(name=first.image.name).exists())
+        self.assertEqual(MediaFile.objects.get(name=second.image.name).ref_count, 1)
+
+    def test_recount_repairs_counts_and_collects_orphans_with_variants(self, schedule_variants):
+        kept = self.post('Kept', b'kept bytes')
+        orphan = self.post('Orphan', b'orphan bytes')
+        orphan_name = orphan.image.name
+        variant = variant_name(orphan_name, source_digest(b'orphan bytes'), 'thumb', 'webp')
+        variant = default_storage.save(variant, ContentFile(b'variant'))
+
+        # Drift: a lost reference and a row changed without signals
+        MediaFile.objects.filter(name=kept.image.name).update(ref_count=5)
+        Blog.objects.filter(pk=orphan.pk).update(image='')
+        call_command('recount_media_references', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(MediaFile.objects.get(name=kept.image.name).ref_count, 1)
+        self.assertFalse(MediaFile.objects.filter(name=orphan_name).exists())
+        for name in (orphan_name, variant):
+            self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, name)), name)
+        self.assertTrue(os.path.exists(kept.image.path))
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = make_user('reader')
+        self.sender = make_user('sender')
+        self.client.force_login(self.reader)
+
+    def notify(self, **kwargs):
+        return Notification.objects.create(
+            recipient=self.reader, sender=self.sender, notification_type='comment', message='m', **kwargs
+        )
+
+    def badge(self):
+        return self.client.get(reverse('blogs')).context['unread_count']
+
+    def test_count_is_cached_and_dropped_by_every_write(self):
+        for _ in range(12):
+            self.notify()
+        self.assertEqual(self.badge(), 12)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(unread_count(self.reader), 12)
+        self.assertFalse([q for q in queries.captured_queries if 'blog_notification' in q['sql']])
+
+        data = self.client.get(reverse('notification_dropdown')).json()
+        self.assertEqual((data['html'].count('class="notification-item'), data['unread_count']), (10, 12))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_all_notifications_read'))
+        self.assertEqual(self.badge(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = self.notify()
+        self.assertEqual(self.badge(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.delete()
+        self.assertEqual(self.badge(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.bulk_create([
+                Notification(recipient=self.reader, sender=self.sender, notification_type='comment', message='m')
+            ])
+        self.assertEqual(self.badge(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('clear_all_notifications'))
+        self.assertEqual(self.badge(), 0)
+
+    def test_shared_cache_is_configured(self):
+        self.assertNotIn('locmem', settings.CACHES['default']['BACKEND'])
+
+
+class VocabularySuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('writer')
+        self.client.force_login(self.user)
+
+    def create(self, title, category, tags):
+        self.client.post(reverse('create_blog'), {
+            'title': title, 'content': 'c', 'category': category, 'tags': ','.join(tags), 'is_published': 'on',
+        })
+        return Blog.objects.get(title=title)
+
+    def usage(self, model):
+        return dict(model.objects.values_list('name', 'usage_count'))
+
+    def test_usage_counts_follow_posts(self):
+        first = self.create('First', 'Tech', ['python', 'django'])
+        self.create('Second', 'Tech', ['python'])
+        self.assertEqual(self.usage(Tag), {'python': 2, 'django': 1})
+        self.assertEqual(self.usage(Category), {'Tech': 2})
+
+        self.client.post(reverse('edit_blog', args=[first.slug]), {
+            'title': 'First', 'content': 'c', 'category': 'Life', 'tags': 'django,sql',
+        })
+        self.assertEqual(self.usage(Tag), {'python': 1, 'django': 1, 'sql': 1})
+        self.assertEqual(self.usage(Category), {'Tech': 1, 'Life': 1})
+
+        self.client.post(reverse('delete_blog', args=[first.slug]))
+        self.assertEqual(self.usage(Tag), {'python': 1, 'django': 0, 'sql': 0})
+        self.assertEqual(self.usage(Category), {'Tech': 1, 'Life': 0})
+
+        Tag.objects.update(usage_count=9)
+        call_command('recount_vocabulary_usage', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.usage(Tag), {'python': 1, 'django': 0, 'sql': 0})
+
+    def test_suggestions_are_private_and_revalidated_until_usage_changes(self):
+        self.create('First', 'Tech', ['pandas', 'python'])
+        url = reverse('tag_suggestions')
+        response = self.client.get(url, {'q': 'P'})
+        self.assertEqual(response.json(), ['pandas', 'python'])
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, {'q': 'p'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.create('Second', 'Tech', ['python'])
+        response = self.client.get(url, {'q': 'p'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), ['python', 'pandas'])
+
+
+class FollowApprovalTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner', visibility='private')
+        self.fan = make_user('fan')
+        self.client.force_login(self.fan)
+        self.client.post(reverse('toggle_follow_ajax', args=['owner']))
+        self.follow = Follow.objects.get(follower=self.fan, following=self.owner, is_approved=False)
+
+    def counts(self):
+        return (
+            Profile.objects.get(user=self.owner).followers_count,
+            Profile.objects.get(user=self.fan).following_count,
+        )
+
+    def test_concurrent_approvals_count_once(self):
+        stale = Follow.objects.get(pk=self.follow.pk)
+        self.assertTrue(self.follow.approve())
+        self.assertFalse(stale.approve())
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_approval_views_count_once(self):
+        notification = Notification.objects.get(recipient=self.owner, notification_type='follow_request')
+        self.client.force_login(self.owner)
+        self.client.post(reverse('handle_follow_request', args=[notification.id, 'approve']))
+        self.client.post(reverse('handle_follow_request', args=[notification.id, 'approve']))
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertEqual(self.client.get(reverse('approve_follow_request', args=['fan'])).status_code, 404)
+        self.assertEqual(self.counts(), (1, 1))
+
+
+class RenderedContentTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+
+    def test_body_is_rendered_on_save_and_by_the_command(self):
+        blog = Blog.objects.create(author=self.author.profile, title='Post', content='<b>Hi</b>\nthere ' + 'word ' * 400)
+        self.assertTrue(blog.content_html.startswith('&lt;b&gt;Hi&lt;/b&gt;<br>there'))
+        self.assertEqual((blog.word_count, blog.reading_time), (402, 3))
+        self.assertTrue(blog.excerpt.startswith('<b>Hi</b> there word'))
+
+        Blog.objects.filter(pk=blog.pk).update(content='new body', content_html='', content_version=0)
+        call_command('render_blog_content', chunk_size=1, stdout=StringIO())
+        blog.refresh_from_db()
+        self.assertEqual((blog.content_html, blog.word_count, blog.content_version), ('new body', 2, CONTENT_RENDERER_VERSION))
+        # An excerpt the author (or a previous render) set is kept
+        self.assertTrue(blog.excerpt.startswith('<b>Hi</b>'))
+
+
+def png_bytes(size=(800, 400), color=(200, 40, 40)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ImageVariantTests(TempMediaTestCase):
+    def setUp(self):
+        # Variants are rendered explicitly below, not by the background pool
+        patcher = mock.patch('blog.signals.schedule_variants')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data = png_bytes()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog = Blog.objects.create(
+                author=make_user('alice').profile, title='Post', content='c',
+                image=SimpleUploadedFile('photo.png', self.data, 'image/png'),
+            )
+
+    def test_variants_are_saved_by_name_in_the_field_storage(self):
+        source = self.blog.image.name
+        self.assertEqual(store_variants(Blog, self.blog.pk, BLOG_IMAGE, source, render_variants(self.data)), 1)
+        self.blog.refresh_from_db()
+        variants = self.blog.image_variants
+        self.assertEqual([width for _, width in variants['webp']], [160, 640, 800])
+        digest = source_digest(self.data)
+        self.assertEqual(variants['webp'][0][0], variant_name(source, digest, 'thumb', 'webp'))
+        storage = self.blog.image.storage
+        recorded = {name for ext in ('webp', 'jpg') for name, _ in variants[ext]}
+        self.assertEqual(set(stored_variants(source, storage)), recorded)
+        self.assertEqual(len(recorded), 6)
+        self.assertEqual(self.blog.image_placeholder['color'], '#c82828')
+
+        html = Template('{% load images %}{% picture blog.image blog.image_variants "640px" %}').render(Context({'blog': self.blog}))
+        self.assertIn('<picture', html)
+        self.assertIn(storage.url(variants['webp'][0][0]), html)
+
+        # A replaced image is not recorded with the old one's variants
+        self.assertEqual(store_variants(Blog, self.blog.pk, BLOG_IMAGE, 'blogs/other.png', render_variants(self.data)), 0)
+
+    def test_store_retries_while_the_database_is_locked(self):
+        future = mock.Mock(**{'result.return_value': {}})
+        with mock.patch('blog.images.store_variants', side_effect=[OperationalError('database is locked'), 1]) as store, \
+                mock.patch('blog.images.time.sleep') as sleep:
+            _store_rendered(Blog, self.blog.pk, BLOG_IMAGE, self.blog.image.name, future)
+        self.assertEqual((store.call_count, sleep.call_count), (2, 1))
+
+        with mock.patch('blog.images.store_variants', side_effect=OperationalError('database is locked')) as store, \
+                mock.patch('blog.images.time.sleep'), self.assertLogs('blog.images', 'ERROR'):
+            _store_rendered(Blog, self.blog.pk, BLOG_IMAGE, self.blog.image.name, future)
+        self.assertEqual(store.call_count, STORE_ATTEMPTS)
+
+    def test_command_renders_pending_images(self):
+        call_command('generate_image_variants', workers=1, stdout=StringIO())
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.image_variants['source'], self.blog.image.name)
+        self.assertEqual(self.blog.image_placeholder['source'], self.blog.image.name)
+
+    def test_placeholder_is_shown_only_for_its_image(self):
+        placeholder = render_placeholder(self.data)
+        self.assertEqual(placeholder['color'], '#c82828')
+        self.assertTrue(placeholder['lqip'].startswith('data:image/webp;base64,'))
+        self.assertEqual(store_placeholder(Blog, self.blog.pk, BLOG_IMAGE, 'blogs/other.png', placeholder), 0)
+        self.assertEqual(store_placeholder(Blog, self.blog.pk, BLOG_IMAGE, self.blog.image.name, placeholder), 1)
+
+        template = Template('{% load images %}{% picture blog.image blog.image_variants "640px" placeholder=blog.image_placeholder %}')
+        self.blog.refresh_from_db()
+        self.assertIn('background: #c82828 url(data:image/webp;base64,', template.render(Context({'blog': self.blog})))
+
+        # A stale placeholder of a replaced image is not rendered
+        self.blog.image.name = 'blogs/other.png'
+        self.assertNotIn('background', template.render(Context({'blog': self.blog})))
+
+
+class UniqueViewerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def guest_request(self, **meta):
+        request = self.factory.get('/', HTTP_USER_AGENT='agent', **meta)
+        request.user = AnonymousUser()
+        return request
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter()
+        items = [f'user:{i}'.encode() for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f'other:{i}'.encode() in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+        self.assertTrue(items[0] in BloomFilter(data=bytes(bloom.data)))
+
+    def test_viewers_are_counted_once_per_window(self):
+        self.assertTrue(is_new_viewer('blog', b'user:1'))
+        self.assertFalse(is_new_viewer('blog', b'user:1'))
+        self.assertTrue(is_new_viewer('other', b'user:1'))
+        with mock.patch('blog.unique_viewers.time.time', return_value=time.time() + WINDOW_SECONDS):
+            self.assertFalse(is_new_viewer('blog', b'user:1'))
+        with mock.patch('blog.unique_viewers.time.time', return_value=time.time() + 2 * WINDOW_SECONDS):
+            self.assertTrue(is_new_viewer('blog', b'user:1'))
+
+    def test_forwarded_for_is_only_trusted_from_configured_proxies(self):
+        spoofed = {'REMOTE_ADDR': '10.0.0.1', 'HTTP_X_FORWARDED_FOR': '6.6.6.6, 203.0.113.7'}
+        self.assertEqual(viewer_key(self.guest_request(**spoofed)), b'anon:10.0.0.1:agent')
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(viewer_key(self.guest_request(**spoofed)), b'anon:203.0.113.7:agent')
+            self.assertEqual(viewer_key(self.guest_request(REMOTE_ADDR='10.0.0.1')), b'anon:10.0.0.1:agent')
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.quiet = Blog.objects.create(author=self.author.profile, title='Quiet', content='c', views=1)
+        self.popular = Blog.objects.create(author=self.author.profile, title='Popular', content='c', views=50)
+        Blog.objects.create(author=self.author.profile, title='Draft', content='c', views=500, is_published=False)
+
+    def test_scores_are_computed_on_first_visit(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('trending'), {'filter': 'today'})
+        self.assertEqual([blog.title for blog in response.context['blogs']], ['Popular', 'Quiet'])
+
+    def test_only_changed_and_expired_posts_are_rescored(self):
+        self.assertEqual(compute_trending(), (2, 0))
+        self.assertEqual(compute_trending(), (0, 0))
+
+        Blog.objects.filter(pk=self.quiet.pk).update(views=5000)
+        self.assertEqual(compute_trending(), (1, 0))
+        top = TrendingScore.objects.filter(window='all').order_by('-score')[0]
+        self.assertEqual(top.blog_id, self.quiet.pk)
+
+        Blog.objects.filter(pk=self.popular.pk).update(is_published=False)
+        compute_trending(now=timezone.now() + timedelta(days=2))
+        self.assertFalse(TrendingScore.objects.filter(blog=self.popular).exists())
+        windows = TrendingScore.objects.filter(blog=self.quiet).values_list('window', flat=True)
+        self.assertEqual(sorted(windows), ['all', 'month', 'week'])
+
+    def test_authors_are_notified_once_when_entering_the_top(self):
+        compute_trending()
+        self.assertEqual(notify_trending(), 2)
+        cache.clear()  # A lost snapshot does not notify again
+        self.assertEqual(notify_trending(), 0)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.viewer = make_user('annette')
+        for username in ('annabel', 'ann', 'bob', 'anna', 'annika'):
+            make_user(username)
+
+    def test_exact_username_first_and_pages_keep_the_ranking(self):
+        ranked, count = user_search_page('ann', self.viewer, per_page=10)
+        ranked = [user.username for user in ranked]
+        self.assertEqual(ranked[0], 'ann')
+        self.assertEqual(sorted(ranked), ['ann', 'anna', 'annabel', 'annika'])
+        self.assertEqual(count, 4)
+
+        walked, cursor = [], None
+        while True:
+            page, _ = user_search_page('ann', self.viewer, cursor, per_page=3)
+            walked += [user.username for user in page]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(walked, ranked)
+
+    def test_search_page_lists_matches_best_first(self):
+        self.client.force_login(self.viewer)
+        response = self.client.get(reverse('search_users'), {'q': 'ann'})
+        self.assertEqual(response.context['users'].items[0].username, 'ann')
+        self.assertEqual(response.context['result_count'], 4)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author', visibility='private')
+        self.reader = make_user('reader')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='c')
+        self.comment = Comment.objects.create(blog=self.blog, user=self.author, content='top')
+        for i in range(12):
+            Comment.objects.create(blog=self.blog, user=self.author, parent=self.comment, content=f'reply {i}')
+
+    def test_replies_are_paged_in_order(self):
+        self.client.force_login(self.author)
+        url = reverse('load_replies', args=[self.comment.id])
+        data = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+        self.assertEqual(data['html'].count('reply '), REPLIES_PAGE_SIZE)
+        data = self.client.get(url, {'cursor': data['next_cursor']}, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+        self.assertIn('reply 11', data['html'])
+        self.assertIsNone(data['next_cursor'])
+        Comment.objects.filter(pk=self.comment.pk).recount_replies()
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).reply_count, 12)
+
+    def test_threads_of_hidden_posts_are_404(self):
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(reverse('load_comments', args=[self.blog.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('load_replies', args=[self.comment.id])).status_code, 404)
+
+        Profile.objects.filter(user=self.author).update(profile_visibility='public')
+        self.assertEqual(self.client.get(reverse('load_comments', args=[self.blog.id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('load_replies', args=[self.comment.id])).status_code, 200)
+
+
+class VisibilityTests(TestCase):
+    def setUp(self):
+        self.reader = make_user('reader')
+        self.follower = make_user('follower')
+        self.posts = {}
+        for visibility in ('public', 'followers', 'private'):
+            author = make_user(f'{visibility}_author', visibility=visibility)
+            self.posts[visibility] = Blog.objects.create(author=author.profile, title=visibility, content='c')
+            Follow.objects.create(follower=self.follower, following=author, is_approved=True)
+        Follow.objects.create(follower=self.reader, following=User.objects.get(username='followers_author'), is_approved=False)
+
+    def titles(self, user):
+        return set(Blog.objects.visible_to(user).values_list('title', flat=True))
+
+    def test_visibility_is_resolved_in_one_query(self):
+        self.assertEqual(self.titles(None), {'public'})
+        self.assertEqual(self.titles(self.reader), {'public'})
+        self.assertEqual(self.titles(self.follower), {'public', 'followers'})
+        self.assertEqual(self.titles(User.objects.get(username='private_author')), {'public', 'private'})
+        with self.assertNumQueries(1):
+            list(Blog.objects.visible_to(self.follower))
+
+    def test_explore_feed_lists_only_visible_posts(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('blogs'))
+        self.assertEqual([blog.title for blog in response.context['blogs']], ['public'])
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.first = Blog.objects.create(author=self.author.profile, title='First', content='c')
+        self.second = Blog.objects.create(author=self.author.profile, title='Second', content='c')
+
+    def views(self):
+        return dict(Blog.objects.values_list('title', 'views'))
+
+    def test_views_are_written_in_grouped_batches(self):
+        buffer = ViewCountBuffer(interval=3600, max_events=5)
+        for blog in (self.first, self.first, self.second):
+            buffer.add(blog.id)
+        self.assertEqual(buffer.pending(self.first.id), 2)
+        self.assertEqual(self.views(), {'First': 0, 'Second': 0})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 3)
+        # One UPDATE per distinct increment
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "blog_blog"')]), 2)
+        self.assertEqual(self.views(), {'First': 2, 'Second': 1})
+        self.assertEqual(buffer.pending(self.first.id), 0)
+
+        for _ in range(5):  # Reaching max_events flushes at once
+            buffer.add(self.second.id)
+        self.assertEqual(self.views(), {'First': 2, 'Second': 6})
+
+    def test_failed_flush_keeps_the_views(self):
+        buffer = ViewCountBuffer(interval=3600)
+        buffer.add(self.first.id)
+        with mock.patch.object(Blog.objects, 'filter', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+        self.assertEqual(buffer.pending(self.first.id), 1)
+        buffer.flush()
+        self.assertEqual(self.views()['First'], 1)
+
+    def test_endpoint_counts_each_viewer_once(self):
+        reader = make_user('reader')
+        self.client.force_login(reader)
+        url = reverse('increment_blog_view', args=[self.first.id])
+        with mock.patch('blog.view_counter.view_buffer', ViewCountBuffer(interval=3600)):
+            self.assertEqual(self.client.post(url).json(), {'status': 'incremented', 'views': 1})
+            self.assertEqual(self.client.post(url).json(), {'status': 'already_viewed', 'views': 1})
+            self.client.force_login(self.author)
+            self.assertEqual(self.client.post(url).json()['status'], 'skipped')
+
+
+class TrendingNotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Hot', content='c', views=100)
+
+    def trending_notifications(self):
+        return Notification.objects.filter(notification_type='trending')
+
+    def test_only_the_job_notifies_and_only_once(self):
+        self.client.force_login(make_user('reader'))
+        self.client.get(reverse('trending'))
+        self.assertFalse(self.trending_notifications().exists())
+
+        call_command('compute_trending', stdout=StringIO())
+        self.assertEqual(list(self.trending_notifications().values_list('recipient', 'blog')), [(self.author.id, self.blog.id)])
+        cache.clear()
+        call_command('compute_trending', full=True, stdout=StringIO())
+        self.assertEqual(self.trending_notifications().count(), 1)
+
+
+class BlogSearchTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.in_body = Blog.objects.create(author=self.author.profile, title='Notes', content='a few words on django')
+        self.in_title = Blog.objects.create(author=self.author.profile, title='Django tips', content='short')
+
+    def titles(self, query, user=None, **kwargs):
+        return [blog.title for blog in search_page(query, user or self.reader, **kwargs)]
+
+    def test_title_matches_rank_first_and_index_follows_edits(self):
+        self.assertEqual(self.titles('django'), ['Django tips', 'Notes'])
+
+        self.in_body.content = 'nothing here'
+        self.in_body.excerpt = ''  # Regenerated from the new body
+        self.in_body.save()
+        self.assertEqual(self.titles('django'), ['Django tips'])
+        self.in_title.delete()
+        self.assertEqual(self.titles('django'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.titles('nothing'), ['Notes'])
+
+    def test_pages_follow_the_ranking_and_skip_hidden_posts(self):
+        hidden = make_user('hidden', visibility='private')
+        Blog.objects.create(author=hidden.profile, title='Django secrets', content='c')
+        for i in range(3):
+            Blog.objects.create(author=self.author.profile, title=f'Post {i}', content='django')
+
+        expected = self.titles('django', per_page=10)
+        self.assertNotIn('Django secrets', expected)
+        walked, cursor = [], None
+        while True:
+            page = search_page('django', self.reader, cursor, per_page=2)
+            walked += [blog.title for blog in page]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(walked, expected)
+        self.assertIn('Django secrets', self.titles('django', hidden, per_page=10))
+
+
+class CommentQueryCountTests(TestCase):
+    def test_comment_page_queries_do_not_grow_with_comments(self):
+        author = make_user('author')
+        blog = Blog.objects.create(author=author.profile, title='Post', content='c')
+        self.client.force_login(author)
+        url = reverse('load_comments', args=[blog.id])
+
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(captured.captured_queries)
+
+        for i in range(2):
+            commenter = make_user(f'commenter{i}')
+            Comment.objects.create(blog=blog, user=commenter, content='c')
+        few = queries()
+        for i in range(2, 12):
+            commenter = make_user(f'commenter{i}')
+            Comment.objects.create(blog=blog, user=commenter, content='c')
+        self.assertEqual(queries(), few)
+
+
+class ViewerStateTests(TestCase):
+    def setUp(self):
+        self.viewer = make_user('viewer')
+        self.others = [make_user(f'other{i}') for i in range(3)]
+        self.blogs = [
+            Blog.objects.create(author=other.profile, title=f'Post {i}', content='c')
+            for i, other in enumerate(self.others)
+        ]
+        Like.objects.create(user=self.viewer, blog=self.blogs[0])
+        Follow.objects.create(follower=self.viewer, following=self.others[1], is_approved=True)
+        Follow.objects.create(follower=self.viewer, following=self.others[2], is_approved=False)
+
+    def test_one_query_each_for_likes_and_follows(self):
+        with self.assertNumQueries(2):
+            state = viewer_state(self.viewer, blogs=self.blogs, users=self.others)
+        self.assertEqual(state.liked_blog_ids, {self.blogs[0].id})
+        self.assertEqual(state.following_ids, {self.others[1].id})
+        self.assertEqual(state.requested_ids, {self.others[2].id})
+
+    def test_anonymous_viewer_and_empty_page_run_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(viewer_state(AnonymousUser(), blogs=self.blogs).liked_blog_ids, set())
+            self.assertEqual(viewer_state(self.viewer).following_ids, set())
+
+
+class BulkFollowRequestTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner', visibility='private')
+        self.fans = [make_user(f'fan{i}') for i in range(3)]
+        for fan in self.fans:
+            self.client.force_login(fan)
+            self.client.post(reverse('toggle_follow_ajax', args=['owner']))
+        self.follow_ids = list(
+            Follow.objects.filter(following=self.owner).order_by('id').values_list('id', flat=True)
+        )
+        self.client.force_login(self.owner)
+
+    def bulk(self, action, follow_ids):
+        return self.client.post(reverse('bulk_follow_requests'), {'action': action, 'follow_ids': follow_ids})
+
+    def test_approve_many_and_skip_handled(self):
+        response = self.bulk('approve', self.follow_ids[:2])
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(Profile.objects.get(user=self.owner).followers_count, 2)
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.owner, notification_type='follow_request', is_read=False).count(), 1
+        )
+
+        # Already approved requests are not counted again
+        response = self.bulk('approve', self.follow_ids)
+        self.assertEqual(response.json()['follow_ids'], self.follow_ids[2:])
+        self.assertEqual(Profile.objects.get(user=self.owner).followers_count, 3)
+
+    def test_reject_deletes_requests(self):
+        response = self.bulk('reject', self.follow_ids)
+        self.assertEqual(response.json()['status'], 'rejected')
+        self.assertFalse(Follow.objects.filter(following=self.owner).exists())
+        self.assertEqual(Profile.objects.get(user=self.owner).followers_count, 0)
+        self.assertEqual(Notification.objects.filter(recipient=self.fans[0]).count(), 1)
+
+    def test_other_users_requests_are_ignored(self):
+        self.client.force_login(self.fans[0])
+        self.assertEqual(self.bulk('approve', self.follow_ids).json()['count'], 0)
+        self.assertEqual(self.bulk('maybe', self.follow_ids).status_code, 400)
+        self.assertEqual(self.bulk('approve', ['x']).status_code, 400)
+
+    def test_inbox_lists_pending_requests(self):
+        response = self.client.get(reverse('follow_requests'))
+        self.assertEqual(len(response.context['follow_requests']), 3)
+
+
+class SetBlogTagsTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='c')
+
+    def tag_names(self):
+        return sorted(self.blog.tags.values_list('name', flat=True))
+
+    def test_writes_only_the_difference(self):
+        self.assertEqual(set_blog_tags(self.blog, ['Python', 'django'], created=True), (2, 0))
+        self.assertEqual(set_blog_tags(self.blog, ['python', 'Web', 'web']), (1, 1))
+        self.assertEqual(self.tag_names(), ['Python', 'Web'])
+        self.assertEqual(set_blog_tags(self.blog, ['Python', 'Web']), (0, 0))
+        self.assertEqual(
+            dict(Tag.objects.values_list('slug', 'usage_count')), {'python': 1, 'django': 0, 'web': 1}
+        )
+
+    def test_query_count_does_not_grow_with_tags(self):
+        def queries(names):
+            blog = Blog.objects.create(author=self.author.profile, title=f'Post {len(names)}', content='c')
+            with CaptureQueriesContext(connection) as captured:
+                set_blog_tags(blog, names, created=True)
+            return len(captured.captured_queries)
+
+        self.assertEqual(queries(['a', 'b']), queries([f'tag{i}' for i in range(20)]))
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='body')
+        set_blog_tags(self.blog, ['django', 'sql'], created=True)
+        Like.objects.create(user=self.reader, blog=self.blog)
+        parent = Comment.objects.create(blog=self.blog, user=self.reader, content='first')
+        Comment.objects.create(blog=self.blog, user=self.author, parent=parent, content='reply')
+
+    def export(self, chunk_size=100):
+        stream = StringIO()
+        export_blogs(stream, chunk_size)
+        return stream.getvalue().splitlines()
+
+    def test_round_trip(self):
+        lines = self.export(chunk_size=1)
+        self.assertEqual(len(lines), 1)
+        Blog.objects.all().delete()
+
+        stats = import_blogs(lines)
+        self.assertEqual((stats['blogs'], stats['comments'], stats['likes']), (1, 2, 1))
+        blog = Blog.objects.get()
+        self.assertEqual((blog.id, blog.slug, blog.created_at), (self.blog.id, self.blog.slug, self.blog.created_at))
+        self.assertEqual(sorted(blog.tags.values_list('name', flat=True)), ['django', 'sql'])
+        self.assertEqual((blog.like_count, blog.comment_count), (1, 2))
+        reply = Comment.objects.get(content='reply')
+        self.assertEqual((reply.parent.content, reply.parent.reply_count), ('first', 1))
+
+    def test_existing_posts_and_unknown_authors_are_skipped(self):
+        lines = self.export()
+        self.assertEqual(import_blogs(lines)['skipped_existing'], 1)
+
+        Blog.objects.all().delete()
+        User.objects.filter(username='author').delete()
+        self.assertEqual(import_blogs(lines)['skipped_no_author'], 1)
+        stats = import_blogs(lines, create_users=True)
+        self.assertEqual((stats['blogs'], stats['users']), (1, 1))
+        self.assertFalse(User.objects.get(username='author').has_usable_password())
+
+
+class DeferredBodyTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.blog = Blog.objects.create(author=self.author.profile, title='Post', content='the body', is_published=True)
+        self.client.force_login(self.author)
+
+    def test_list_pages_never_load_bodies(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('blogs'))
+        self.assertContains(response, 'Post')
+        for column in ('"blog_blog"."content"', '"blog_blog"."content_html"'):
+            self.assertFalse([query for query in captured.captured_queries if column in query['sql']])
+
+    def test_body_endpoint_respects_visibility(self):
+        url = reverse('blog_body', args=[self.blog.id])
+        self.assertEqual(self.client.get(url).json(), {'content_html': 'the body'})
+
+        Profile.objects.filter(user=self.author).update(profile_visibility='private')
+        self.client.force_login(make_user('stranger'))
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,176 @@
+"""
+Per-user "Following" timeline.
+
+Posts are pushed into TimelineEntry rows for each approved follower when they
+are published (fan-out-on-write), so reading a page is one indexed range scan
+on (user, created_at). Authors with a very large audience are not fanned out;
+their posts are pulled at read time and merged in (hybrid push/pull).
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Blog, Follow, TimelineEntry
+from .pagination import PAGE_SIZE, KeysetPage, KeysetPaginator, NEWEST_FIRST, encode_cursor
+
+# Rows kept per reader; older ones are removed by `manage.py trim_timelines`
+TIMELINE_MAX_ENTRIES = 1000
+
+# Rows written per INSERT during fan-out
+FANOUT_BATCH_SIZE = 1000
+
+# Authors with more approved followers than this are read in pull mode
+PULL_MODE_FOLLOWER_THRESHOLD = 10000
+
+# Recent posts copied into a timeline when a new follow is approved
+BACKFILL_POSTS = 50
+
+PULL_AUTHORS_CACHE_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_CACHE_SECONDS = 600
+
+
+def pull_mode_author_ids():
+    """IDs of users whose posts are pulled at read time instead of fanned out (cached)"""
+    author_ids = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if author_ids is None:
+        author_ids = set(
+            Follow.objects.filter(is_approved=True)
+            .values('following')
+            .annotate(total=Count('id'))
+            .filter(total__gt=PULL_MODE_FOLLOWER_THRESHOLD)
+            .values_list('following', flat=True)
+        )
+        cache.set(PULL_AUTHORS_CACHE_KEY, author_ids, PULL_AUTHORS_CACHE_SECONDS)
+    return author_ids
+
+
+def _fans_out(author_profile):
+    """Whether posts by this author should be pushed into follower timelines"""
+    if author_profile.profile_visibility == 'private':
+        return False
+    return author_profile.user_id not in pull_mode_author_ids()
+
+
+def fan_out_blog(blog):
+    """Push a newly published blog into the timeline of every approved follower, in batches"""
+    if not blog.is_published or not _fans_out(blog.author):
+        return
+
+    follower_ids = (
+        Follow.objects.filter(following_id=blog.author.user_id, is_approved=True)
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(TimelineEntry(user_id=follower_id, blog=blog, created_at=blog.created_at))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def remove_blog_from_timelines(blog):
+    """Drop a blog from all timelines (e.g. when it is unpublished)"""
+    TimelineEntry.objects.filter(blog=blog).delete()
+
+
+def backfill_timeline(follower, following):
+    """Copy the followed author's latest posts into a new follower's timeline"""
+    if not _fans_out(following.profile):
+        return
+
+    recent = Blog.objects.published().filter(author__user=following).order_by(*NEWEST_FIRST)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=follower, blog_id=blog_id, created_at=created_at)
+            for blog_id, created_at in recent.values_list('id', 'created_at')[:BACKFILL_POSTS]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_timelines(follower_ids, following):
+    """`backfill_timeline` for many new followers at once, in batched INSERTs"""
+    if not _fans_out(following.profile):
+        return
+
+    recent = Blog.objects.published().filter(author__user=following).order_by(*NEWEST_FIRST)
+    recent = list(recent.values_list('id', 'created_at')[:BACKFILL_POSTS])
+
+    batch = []
+    for follower_id in follower_ids:
+        for blog_id, created_at in recent:
+            batch.append(TimelineEntry(user_id=follower_id, blog_id=blog_id, created_at=created_at))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def drop_author_from_timeline(follower, following):
+    """Remove an unfollowed author's posts from the follower's timeline"""
+    TimelineEntry.objects.filter(user=follower, blog__author__user=following).delete()
+
+
+def trim_timeline(user_id, keep=TIMELINE_MAX_ENTRIES):
+    """Delete everything older than the newest `keep` entries of one timeline"""
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-created_at', '-blog_id')
+        .values_list('created_at', 'blog_id')[keep:keep + 1]
+    )
+    cutoff = list(cutoff)
+    if not cutoff:
+        return 0
+    # Cut on the feed's (created_at, blog id) order: a fan-out writes many
+    # entries with the same created_at, and the kept ones must survive the tie
+    created_at, blog_id = cutoff[0]
+    deleted, _ = TimelineEntry.objects.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, blog_id__lte=blog_id),
+        user_id=user_id,
+    ).delete()
+    return deleted
+
+
+def timeline_page(user, cursor=None, per_page=PAGE_SIZE):
+    """
+    One page of the user's Following feed, newest first.
+    Pushed entries and pull-mode authors share the (created_at, blog id) cursor.
+    """
+    entries = (
+        TimelineEntry.objects.filter(user=user, blog__is_published=True)
+        .exclude(blog__author__profile_visibility='private')
+        .select_related('blog__author__user', 'blog__category')
+        .defer(*('blog__' + field for field in Blog.BODY_FIELDS))
+    )
+    pushed = KeysetPaginator(entries, ('-created_at', '-blog_id'), per_page).page(cursor)
+    rows = [(entry.created_at, entry.blog_id, entry.blog) for entry in pushed]
+    has_more = pushed.has_next
+
+    pull_authors = Follow.objects.filter(
+        follower=user,
+        is_approved=True,
+        following_id__in=pull_mode_author_ids()
+    ).values('following_id')
+    if pull_authors.exists():
+        pulled_blogs = (
+            Blog.objects.published()
+            .filter(author__user__in=pull_authors)
+            .exclude(author__profile_visibility='private')
+            .without_body()
+            .select_related('author__user', 'category')
+        )
+        pulled = KeysetPaginator(pulled_blogs, NEWEST_FIRST, per_page).page(cursor)
+        seen = {blog_id for _, blog_id, _ in rows}
+        rows += [(blog.created_at, blog.id, blog) for blog in pulled if blog.id not in seen]
+        has_more = has_more or pulled.has_next
+
+    rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+    has_more = has_more or len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = encode_cursor([rows[-1][0], rows[-1][1]]) if has_more and rows else None
+    return KeysetPage([blog for _, _, blog in rows], next_cursor)
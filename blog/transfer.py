@@ -0,0 +1,418 @@
+"""
+Streaming JSONL export/import of posts.
+
+Each line is one post with everything attached to it:
+
+    {"id": "...", "author": "alice", "title": "...", "slug": "...",
+     "category": "Tech", "tags": ["django", "sql"], "excerpt": "...",
+     "content": "...", "image": "blogs/x.png", "is_published": true,
+     "views": 10, "created_at": "...", "updated_at": "...",
+     "likes": [{"user": "bob", "created_at": "..."}],
+     "comments": [{"id": 1, "user": "bob", "parent": null, "content": "...",
+                   "is_approved": true, "created_at": "..."}]}
+
+Users are referenced by username and tags/categories by name, so a dump can
+be loaded into another database. Both directions work in chunks: export reads
+posts with `iterator(chunk_size=...)` (related rows prefetched per chunk) and
+import writes each chunk with a handful of `bulk_create` calls in one
+transaction, resolving names through bounded lookup caches. Memory stays
+proportional to the chunk size, not to the dump.
+"""
+import json
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from .models import Blog, Category, Comment, Like, MediaFile, Profile, Tag
+from .search import index_blogs
+from .tagging import tag_ids_by_slug, tag_slug
+from .user_search import index_users
+from .vocabulary import bump_vocabulary_version
+
+BlogTag = Blog.tags.through
+
+# Posts read or written per chunk
+TRANSFER_CHUNK_SIZE = 1000
+
+# Rows per UPDATE when exported timestamps are written back
+TIMESTAMP_BATCH_SIZE = 500
+
+# Entries kept per lookup cache (usernames, tags, categories)
+LOOKUP_CACHE_SIZE = 100000
+
+
+class LookupCache:
+    """Bounded name -> id map; the least recently used names are evicted first"""
+
+    def __init__(self, max_size=LOOKUP_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def update(self, mapping):
+        for key, value in mapping.items():
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+class TransferEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeps milliseconds only; keep full timestamps so keyset order survives"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def bulk_create_keeping_timestamps(model, rows, fields=('created_at',)):
+    """
+    bulk_create `rows` with their exported timestamps. auto_now/auto_now_add
+    overwrite those on insert, so they are written back with one bulk_update.
+    """
+    timestamps = [[getattr(row, field) for field in fields] for row in rows]
+    model.objects.bulk_create(rows)
+    for row, values in zip(rows, timestamps):
+        for field, value in zip(fields, values):
+            setattr(row, field, value)
+    model.objects.bulk_update(rows, fields, batch_size=TIMESTAMP_BATCH_SIZE)
+
+
+# EXPORT
+def export_blogs(stream, chunk_size=TRANSFER_CHUNK_SIZE):
+    """Write every post to `stream` as JSONL; returns how many were written"""
+    blogs = (
+        Blog.objects.order_by('created_at', 'id')
+        .select_related('author__user', 'category')
+        .prefetch_related(
+            'tags',
+            Prefetch('likes', queryset=Like.objects.select_related('user').order_by('created_at', 'id')),
+            Prefetch('comments', queryset=Comment.objects.select_related('user').order_by('created_at', 'id')),
+        )
+    )
+
+    written = 0
+    for blog in blogs.iterator(chunk_size=chunk_size):
+        record = {
+            'id': blog.id,
+            'author': blog.author.user.username,
+            'title': blog.title,
+            'slug': blog.slug,
+            'category': blog.category.name if blog.category else None,
+            'tags': [tag.name for tag in blog.tags.all()],
+            'excerpt': blog.excerpt,
+            'content': blog.content,
+            'image': blog.image.name or None,
+            'is_published': blog.is_published,
+            'views': blog.views,
+            'created_at': blog.created_at,
+            'updated_at': blog.updated_at,
+            'likes': [
+                {'user': like.user.username, 'created_at': like.created_at}
+                for like in blog.likes.all()
+            ],
+            'comments': [
+                {
+                    'id': comment.id,
+                    'user': comment.user.username,
+                    'parent': comment.parent_id,
+                    'content': comment.content,
+                    'is_approved': comment.is_approved,
+                    'created_at': comment.created_at,
+                }
+                for comment in blog.comments.all()
+            ],
+        }
+        stream.write(json.dumps(record, cls=TransferEncoder) + '\n')
+        written += 1
+    return written
+
+
+# IMPORT
+class BlogImporter:
+    """
+    Loads JSONL records chunk by chunk. Posts whose id already exists are
+    skipped, so an interrupted import can simply be run again.
+    """
+
+    def __init__(self, chunk_size=TRANSFER_CHUNK_SIZE, create_users=False):
+        self.chunk_size = chunk_size
+        self.create_users = create_users
+        self.users = LookupCache()        # username -> (user id, profile id)
+        self.categories = LookupCache()   # slug -> category id
+        self.tags = LookupCache()         # slug -> tag id
+        self.stats = defaultdict(int)
+
+    def run(self, lines):
+        chunk = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return dict(self.stats)
+
+    def import_chunk(self, records):
+        with transaction.atomic():
+            self._resolve_users(records)
+            self._resolve_categories(records)
+            self._resolve_tags(records)
+
+            blogs = self._new_blogs(records)
+            if not blogs:
+                return
+            bulk_create_keeping_timestamps(Blog, [blog for blog, _, _, _ in blogs], ('created_at', 'updated_at'))
+            BlogTag.objects.bulk_create(
+                [BlogTag(blog_id=blog.id, tag_id=tag_id) for blog, tag_ids, _, _ in blogs for tag_id in tag_ids]
+            )
+            likes = [like for _, _, blog_likes, _ in blogs for like in blog_likes]
+            bulk_create_keeping_timestamps(Like, likes)
+            self._create_comments(blogs)
+            Category.objects.adjust_usage(Counter(blog.category_id for blog, _, _, _ in blogs))
+            Tag.objects.adjust_usage(Counter(tag_id for _, tag_ids, _, _ in blogs for tag_id in tag_ids))
+            # Bulk inserts send no signals: count the image references here
+            MediaFile.acquire(blog.image.name for blog, _, _, _ in blogs)
+
+        index_blogs([blog.id for blog, _, _, _ in blogs])
+        self.stats['blogs'] += len(blogs)
+        self.stats['likes'] += len(likes)
+
+    # Name resolution (one IN query per chunk for names not cached yet)
+    def _resolve_users(self, records):
+        usernames = set()
+        for record in records:
+            usernames.add(record['author'])
+            usernames.update(like['user'] for like in record.get('likes') or [])
+            usernames.update(comment['user'] for comment in record.get('comments') or [])
+        missing = [username for username in usernames if username not in self.users]
+        if not missing:
+            return
+
+        found = self._lookup_users(missing)
+        if self.create_users:
+            new_usernames = [username for username in missing if username not in found]
+            if new_usernames:
+                # Imported accounts cannot log in until a password is set
+                User.objects.bulk_create(
+                    [User(username=username, password=make_password(None)) for username in new_usernames],
+                    ignore_conflicts=True,
+                )
+                self.stats['users'] += len(new_usernames)
+            without_profile = list(
+                User.objects.filter(username__in=missing, profile__isnull=True).values_list('id', flat=True)
+            )
+            if without_profile:
+                Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in without_profile])
+                # Bulk inserts send no signals
+                index_users(without_profile)
+            found = self._lookup_users(missing)
+
+        # Unknown usernames are cached as None so they are not looked up again
+        self.users.update({username: found.get(username) for username in missing})
+
+    @staticmethod
+    def _lookup_users(usernames):
+        rows = User.objects.filter(username__in=usernames).values_list('username', 'id', 'profile__id')
+        return {username: (user_id, profile_id) for username, user_id, profile_id in rows}
+
+    def _resolve_categories(self, records):
+        names = {}
+        for record in records:
+            name = (record.get('category') or '').strip()
+            if slugify(name) and slugify(name) not in self.categories:
+                names.setdefault(slugify(name), name)
+        if not names:
+            return
+
+        found = dict(Category.objects.filter(slug__in=names).values_list('slug', 'id'))
+        missing = [slug for slug in names if slug not in found]
+        if missing:
+            Category.objects.bulk_create(
+                [Category(name=names[slug], slug=slug) for slug in missing],
+                ignore_conflicts=True,
+            )
+            found.update(Category.objects.filter(slug__in=missing).values_list('slug', 'id'))
+            bump_vocabulary_version(Category)
+        self.categories.update(found)
+
+    def _resolve_tags(self, records):
+        names = [
+            name
+            for record in records
+            for name in record.get('tags') or []
+            if tag_slug(name) not in self.tags
+        ]
+        if names:
+            self.tags.update(tag_ids_by_slug(names))
+
+    def _user_id(self, username):
+        user = self.users.get(username)
+        return user[0] if user else None
+
+    # Rows
+    def _new_blogs(self, records):
+        """
+        (Blog, tag ids, likes, comments) for each record to insert: known author,
+        id not taken yet, slug made unique. Counters match the rows to be inserted.
+        """
+        ids = {}
+        for record in records:
+            blog_id = uuid.UUID(str(record['id'])) if record.get('id') else uuid.uuid4()
+            ids.setdefault(blog_id, record)
+        existing_ids = set(Blog.objects.filter(id__in=ids).values_list('id', flat=True))
+        slugs = {self._slug(record) for record in ids.values()}
+        taken_slugs = set(Blog.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+
+        blogs = []
+        for blog_id, record in ids.items():
+            author = self.users.get(record['author'])
+            if blog_id in existing_ids:
+                self.stats['skipped_existing'] += 1
+                continue
+            if author is None or author[1] is None:
+                self.stats['skipped_no_author'] += 1
+                continue
+
+            slug = self._slug(record)
+            if slug in taken_slugs:
+                slug = f"{slug[:211]}-{blog_id.hex[:8]}"
+            taken_slugs.add(slug)
+
+            category = slugify(record.get('category') or '')
+            tag_ids = {self.tags.get(tag_slug(name)) for name in record.get('tags') or []} - {None}
+            likes = self._likes(blog_id, record)
+            comments = self._comments(record)
+            created_at = _datetime(record.get('created_at'))
+
+            blog = Blog(
+                id=blog_id,
+                author_id=author[1],
+                title=record['title'],
+                slug=slug,
+                category_id=self.categories.get(category) if category else None,
+                excerpt=record.get('excerpt') or '',
+                content=record.get('content') or '',
+                image=record.get('image') or None,
+                is_published=record.get('is_published', True),
+                views=record.get('views') or 0,
+                like_count=len(likes),
+                comment_count=len(comments),
+                created_at=created_at,
+                updated_at=_datetime(record.get('updated_at'), default=created_at),
+            )
+            # bulk_create skips Blog.save
+            blog.render_content()
+            blogs.append((blog, tag_ids, likes, comments))
+        return blogs
+
+    @staticmethod
+    def _slug(record):
+        return record.get('slug') or slugify(record['title'])[:200]
+
+    def _likes(self, blog_id, record):
+        likes = {}
+        for like in record.get('likes') or []:
+            user_id = self._user_id(like['user'])
+            if user_id is not None:
+                likes.setdefault(user_id, Like(
+                    user_id=user_id, blog_id=blog_id, created_at=_datetime(like.get('created_at'))
+                ))
+        return list(likes.values())
+
+    def _comments(self, record):
+        """
+        (comment, depth, approved reply count) for every comment whose author
+        resolves and whose ancestors are kept too
+        """
+        comments = {
+            comment['id']: comment
+            for comment in record.get('comments') or []
+            if self._user_id(comment['user']) is not None
+        }
+
+        # Depth of each comment, None when an ancestor is missing. Walked
+        # iteratively so long reply chains don't hit the recursion limit.
+        depths = {}
+        for comment_id in comments:
+            path = []
+            node, depth = comment_id, None
+            while node not in depths and node in comments:
+                depths[node] = None  # Guards against cycles in bad input
+                path.append(node)
+                node = comments[node].get('parent')
+                if node is None:
+                    depth = -1
+                    break
+            else:
+                depth = depths.get(node)
+            for node in reversed(path):
+                depth = None if depth is None else depth + 1
+                depths[node] = depth
+
+        kept = [comment for comment_id, comment in comments.items() if depths[comment_id] is not None]
+        reply_counts = defaultdict(int)
+        for comment in kept:
+            if comment.get('parent') is not None and comment.get('is_approved', True):
+                reply_counts[comment['parent']] += 1
+        return [(comment, depths[comment['id']], reply_counts[comment['id']]) for comment in kept]
+
+    def _create_comments(self, blogs):
+        """Insert comments one tree level at a time so replies can point at their new parent ids"""
+        levels = defaultdict(list)
+        for blog, _, _, comments in blogs:
+            for comment, depth, reply_count in comments:
+                levels[depth].append((blog.id, comment, reply_count))
+
+        new_ids = {}  # (blog id, exported comment id) -> new comment id
+        for depth in sorted(levels):
+            rows = [
+                Comment(
+                    blog_id=blog_id,
+                    user_id=self._user_id(comment['user']),
+                    parent_id=new_ids[(blog_id, comment['parent'])] if depth else None,
+                    content=comment.get('content') or '',
+                    is_approved=comment.get('is_approved', True),
+                    reply_count=reply_count,
+                    created_at=_datetime(comment.get('created_at')),
+                )
+                for blog_id, comment, reply_count in levels[depth]
+            ]
+            bulk_create_keeping_timestamps(Comment, rows)
+            for (blog_id, comment, _), row in zip(levels[depth], rows):
+                new_ids[(blog_id, comment['id'])] = row.id
+            self.stats['comments'] += len(rows)
+
+
+def _datetime(value, default=None):
+    """Exported timestamp, or `default` (now) when missing"""
+    if value:
+        return parse_datetime(value)
+    return default or timezone.now()
+
+
+def import_blogs(lines, chunk_size=TRANSFER_CHUNK_SIZE, create_users=False):
+    """Load JSONL `lines` (any iterable of str); returns counts of what was imported/skipped"""
+    return BlogImporter(chunk_size, create_users).run(lines)
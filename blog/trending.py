@@ -0,0 +1,178 @@
+"""
+Time-decayed trending scores.
+
+Scores use the Reddit "hot" formula:
+
+    log10(max(points, 1)) + (created_at - EPOCH) / DECAY_SECONDS[window]
+
+where points weight views, likes and comments. Newer posts start higher, so
+older ones need ten times the activity to stay level every DECAY_SECONDS.
+Because the score does not depend on "now", it only changes when a post gets
+new activity; `compute_trending` therefore rescores just those posts and drops
+posts that aged out of a window.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Blog, Notification, TrendingScore
+
+TRENDING_WINDOWS = ('today', 'week', 'month', 'all')
+
+# Shorter windows decay faster: activity counts for less the older the post is
+DECAY_SECONDS = {
+    'today': 45000,
+    'week': 4 * 24 * 3600,
+    'month': 15 * 24 * 3600,
+    'all': 180 * 24 * 3600,
+}
+
+VIEW_WEIGHT = 1
+LIKE_WEIGHT = 5
+COMMENT_WEIGHT = 10
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# Rows written per INSERT while rescoring
+SCORE_BATCH_SIZE = 500
+
+# Authors are notified when their blog enters the top N of any window
+TRENDING_NOTIFY_TOP = 3
+TRENDING_SNAPSHOT_CACHE_KEY = 'trending:notified_top'
+
+
+def window_start(window, now=None):
+    """Earliest created_at included in a window; None for all time"""
+    now = now or timezone.now()
+    if window == 'today':
+        return timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'week':
+        return now - timedelta(days=7)
+    if window == 'month':
+        return now - timedelta(days=30)
+    return None
+
+
+def hot_score(views, likes, comments, created_at, window):
+    points = views * VIEW_WEIGHT + likes * LIKE_WEIGHT + comments * COMMENT_WEIGHT
+    age = (created_at - EPOCH).total_seconds()
+    return math.log10(max(points, 1)) + age / DECAY_SECONDS[window]
+
+
+def _save_scores(rows):
+    TrendingScore.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['blog', 'window'],
+        update_fields=['score', 'created_at', 'views', 'likes', 'comments'],
+    )
+
+
+def compute_trending(now=None, full=False):
+    """
+    Bring TrendingScore up to date; returns (rescored posts, removed rows).
+    With `full`, every published post is rescored.
+    """
+    now = now or timezone.now()
+    starts = {window: window_start(window, now) for window in TRENDING_WINDOWS}
+
+    # Posts that aged out of a window, or were unpublished
+    removed = 0
+    for window, start in starts.items():
+        if start is not None:
+            removed += TrendingScore.objects.filter(window=window, created_at__lt=start).delete()[0]
+    removed += TrendingScore.objects.filter(blog__is_published=False).delete()[0]
+
+    # Posts whose counters moved since the last run (or that were never scored)
+    blogs = Blog.objects.published()
+    if not full:
+        blogs = blogs.exclude(Exists(TrendingScore.objects.filter(
+            blog=OuterRef('pk'),
+            window='all',
+            views=OuterRef('views'),
+            likes=OuterRef('like_count'),
+            comments=OuterRef('comment_count'),
+        )))
+
+    rescored = 0
+    rows = []
+    stats = blogs.values_list('id', 'created_at', 'views', 'like_count', 'comment_count')
+    for blog_id, created_at, views, likes, comments in stats.iterator(chunk_size=SCORE_BATCH_SIZE):
+        rescored += 1
+        for window, start in starts.items():
+            if start is not None and created_at < start:
+                continue
+            rows.append(TrendingScore(
+                blog_id=blog_id,
+                window=window,
+                score=hot_score(views, likes, comments, created_at, window),
+                created_at=created_at,
+                views=views,
+                likes=likes,
+                comments=comments,
+            ))
+        if len(rows) >= SCORE_BATCH_SIZE:
+            _save_scores(rows)
+            rows = []
+    if rows:
+        _save_scores(rows)
+
+    return rescored, removed
+
+
+def ensure_scores():
+    """
+    Score every published post if nothing has been scored yet, so a fresh
+    install or migration shows trending posts before `compute_trending` first
+    runs. Authors are notified by that run, not here.
+    """
+    if not TrendingScore.objects.exists():
+        with transaction.atomic():
+            compute_trending(full=True)
+
+
+def current_top_ids(top_n=TRENDING_NOTIFY_TOP):
+    """Blog IDs in the top N of any trending window"""
+    top_ids = set()
+    for window in TRENDING_WINDOWS:
+        top_ids.update(
+            TrendingScore.objects.filter(window=window)
+            .order_by('-score', '-blog_id')
+            .values_list('blog_id', flat=True)[:top_n]
+        )
+    return top_ids
+
+
+def notify_trending(top_n=TRENDING_NOTIFY_TOP):
+    """
+    Tell authors whose blogs entered the top N since the last run; returns how many
+    notifications were created. The previous top N is kept in the cache, and the
+    unique_trending_notification constraint makes a lost snapshot or a concurrent
+    run harmless.
+    """
+    top_ids = current_top_ids(top_n)
+    previous_ids = cache.get(TRENDING_SNAPSHOT_CACHE_KEY, set())
+    entered = top_ids - previous_ids
+
+    notifications = [
+        Notification(
+            recipient_id=author_user_id,
+            sender=None,  # System-generated
+            notification_type='trending',
+            blog_id=blog_id,
+            message=f"Your blog '{title}' is now trending in the top {top_n}!",
+        )
+        for blog_id, author_user_id, title in (
+            Blog.objects.filter(id__in=entered)
+            .exclude(notification__notification_type='trending')
+            .values_list('id', 'author__user_id', 'title')
+        )
+    ]
+    Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+
+    cache.set(TRENDING_SNAPSHOT_CACHE_KEY, top_ids, None)
+    return len(notifications)
@@ -0,0 +1,87 @@
+"""
+Session-free "has this viewer already been counted?" check for blog views.
+
+Each blog keeps a small Bloom filter per time window in the shared cache. A viewer is
+looked up in the current and previous window and added to the current one, so
+filters rotate out on their own and a returning viewer is counted again after
+one to two windows. A false positive only means a new viewer is not counted.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+WINDOW_SECONDS = 24 * 60 * 60
+
+# Sizing: ~1 KB per blog per window, 4 hash functions -> ~2% false positives at 1000 viewers
+FILTER_BITS = 8192
+HASH_COUNT = 4
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over bytes, using double hashing of one blake2b digest"""
+
+    def __init__(self, bits=FILTER_BITS, hashes=HASH_COUNT, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray(bits // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+
+
+def client_ip(request):
+    """
+    The client's address: REMOTE_ADDR, or behind TRUSTED_PROXY_COUNT proxies
+    the X-Forwarded-For entry added by the outermost of them. Entries left of
+    it come from the client and could be anything.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def viewer_key(request):
+    """Stable identity for a viewer: the user id, or IP + user agent for guests"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'.encode()
+    ip = client_ip(request)
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    return f'anon:{ip}:{agent}'.encode()
+
+
+def _filter_key(blog_id, window):
+    return f'blog_views:seen:{blog_id}:{window}'
+
+
+def is_new_viewer(blog_id, viewer):
+    """Record `viewer` for this blog; True if they haven't been seen in the last window"""
+    window = int(time.time() // WINDOW_SECONDS)
+    current_key = _filter_key(blog_id, window)
+    stored = cache.get_many([current_key, _filter_key(blog_id, window - 1)])
+
+    current = BloomFilter(data=stored.get(current_key))
+    if viewer in current:
+        return False
+    previous = stored.get(_filter_key(blog_id, window - 1))
+    if previous is not None and viewer in BloomFilter(data=previous):
+        return False
+
+    # Concurrent first views may race on this read-modify-write; at worst a view is counted twice
+    current.add(viewer)
+    cache.set(current_key, bytes(current.data), 2 * WINDOW_SECONDS)
+    return True
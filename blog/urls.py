@@ -9,7 +9,10 @@ urlpatterns = [
     path("update_profile/", views.update_profile, name="edit_profile"),
     
     path("blog/", views.blog, name="blogs"),
+    path("following/", views.following_feed, name="following_feed"),
+    path("search/", views.search_blogs, name="search_blogs"),
     path('blog/<uuid:blog_id>/increment-view/', views.increment_blog_view, name='increment_blog_view'),
+    path('blog/<uuid:blog_id>/body/', views.blog_body, name='blog_body'),
      
     path("creaate_blog/", views.create_blog, name="create_blog"),
     path('edit/<slug:slug>/', views.edit_blog, name='edit_blog'),
@@ -22,6 +25,7 @@ urlpatterns = [
     path('user_blog/', views.my_blogs, name='user_blog'),
     path('like/<uuid:blog_id>/', views.toggle_like, name='toggle_like'),
     path('<uuid:blog_id>/comments/', views.load_comments, name='load_comments'),
+    path('comment/<int:comment_id>/replies/', views.load_replies, name='load_replies'),
     path('comment/<uuid:blog_id>/add/', views.add_comment, name='add_comment'),
     path('trending_blogs/', views.trending, name='trending'),
     path('settings/', views.setting, name='setting'),
@@ -46,10 +50,14 @@ urlpatterns = [
     path('follow/toggle/<str:username>/', views.toggle_follow_ajax, name='toggle_follow_ajax'),
     path('unfollow/<int:user_id>/', views.unfollow_user, name='unfollow_user'),
     path('follow/send/<str:username>/', views.send_follow_request, name='send_follow_request'),
+    path('follow/requests/', views.follow_requests, name='follow_requests'),
+    path('follow/requests/bulk/', views.bulk_follow_requests, name='bulk_follow_requests'),
     path('follow/approve/<str:follower_username>/', views.approve_follow_request, name='approve_follow_request'),
     path('follow/reject/<str:follower_username>/', views.reject_follow_request, name='reject_follow_request'),
     path('search-users/', views.search_users, name='search_users'),
+    path('search-users/suggest/', views.suggest_users, name='suggest_users'),
     path('notifications/', views.notification_panel, name='notifications'),
+    path('notifications/dropdown/', views.notification_dropdown, name='notification_dropdown'),
     path('notifications/mark_all_read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     path('notifications/clear_all/', views.clear_all_notifications, name='clear_all_notifications'),
     path('notifications/follow_request/<int:notif_id>/<str:action>/', views.handle_follow_request, name='handle_follow_request'),
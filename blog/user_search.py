@@ -0,0 +1,257 @@
+"""
+Search-as-you-type over usernames and display names.
+
+Like the blog index in `blog.search`, the index is a side table built in SQL:
+
+* SQLite: an FTS5 table keyed by user id with prefix indexes, so every word of
+  the query is matched as a prefix ("gou kum" finds "Gourav Kumar") without
+  scanning the token list.
+* PostgreSQL: lower-cased username/name columns with pg_trgm GIN indexes,
+  matched with LIKE '%...%' and ranked by word_similarity.
+
+Other databases fall back to istartswith. The index is kept in sync by the
+signal handlers in `blog.signals` and rebuilt with `manage.py rebuild_search_index`.
+"""
+import re
+from bisect import bisect_right
+
+from django.contrib.auth.models import User
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from .pagination import PAGE_SIZE, InvalidCursor, KeysetPage, decode_cursor, encode_cursor
+
+# Matches returned to the search page; deeper results are not served
+USER_SEARCH_MAX_RESULTS = 1000
+
+# Added to the score of an exact username match, so it ranks first
+EXACT_USERNAME_BONUS = 1000.0
+
+# Users re-indexed per statement
+INDEX_BATCH_SIZE = 500
+
+
+class SQLiteUserSearchBackend:
+    """FTS5 index with prefix indexes, ranked by BM25"""
+
+    # Column weights for bm25(): username, name
+    WEIGHTS = (4.0, 1.0)
+
+    DOCUMENT_SQL = """
+        INSERT INTO user_search (rowid, username, name)
+        SELECT u.id, u.username, COALESCE(p.name, '')
+        FROM auth_user u
+        LEFT JOIN blog_profile p ON p.user_id = u.id
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5("
+                "username, name, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4')"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS user_search")
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM user_search")
+            cursor.execute(self.DOCUMENT_SQL)
+            cursor.execute("INSERT INTO user_search (user_search) VALUES ('optimize')")
+
+    def reindex(self, user_ids):
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM user_search WHERE rowid IN ({placeholders})", user_ids)
+            cursor.execute(f"{self.DOCUMENT_SQL} WHERE u.id IN ({placeholders})", user_ids)
+
+    def remove(self, user_ids):
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM user_search WHERE rowid IN ({placeholders})", user_ids)
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        bm25 = f"bm25(user_search, {', '.join(str(w) for w in self.WEIGHTS)})"
+        with self.connection.cursor() as cursor:
+            # bm25() is lower-is-better; flip it so every backend sorts by score descending
+            cursor.execute(
+                f"SELECT rowid, (lower(username) = lower(%s)) * %s - {bm25} AS score "
+                f"FROM user_search WHERE user_search MATCH %s ORDER BY score DESC, rowid LIMIT %s",
+                [query.strip(), EXACT_USERNAME_BONUS, match, limit],
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def match_expression(query):
+        """Every word of the input as a quoted prefix query (served by the prefix indexes)"""
+        words = re.findall(r'\w+', query)
+        return ' '.join('"%s"*' % word.replace('"', '""') for word in words)
+
+
+class PostgresUserSearchBackend:
+    """pg_trgm GIN indexes ranked with word_similarity"""
+
+    DOCUMENT_SQL = """
+        INSERT INTO user_search (user_id, username, name)
+        SELECT u.id, lower(u.username), lower(COALESCE(p.name, ''))
+        FROM auth_user u
+        LEFT JOIN blog_profile p ON p.user_id = u.id
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS user_search ("
+                "user_id integer PRIMARY KEY, username text NOT NULL, name text NOT NULL)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS user_search_username_trgm_idx "
+                "ON user_search USING GIN (username gin_trgm_ops)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS user_search_name_trgm_idx "
+                "ON user_search USING GIN (name gin_trgm_ops)"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS user_search")
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("TRUNCATE user_search")
+            cursor.execute(self.DOCUMENT_SQL)
+
+    def reindex(self, user_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"{self.DOCUMENT_SQL} WHERE u.id = ANY(%s) "
+                f"ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username, name = EXCLUDED.name",
+                [list(user_ids)],
+            )
+
+    def remove(self, user_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM user_search WHERE user_id = ANY(%s)", [list(user_ids)])
+
+    def search(self, query, limit):
+        query = query.strip().lower()
+        if not query:
+            return []
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT user_id, GREATEST(2 * word_similarity(%s, username), word_similarity(%s, name)) "
+                "+ (username = %s)::int * %s AS score "
+                "FROM user_search WHERE username LIKE %s OR name LIKE %s "
+                "ORDER BY score DESC, user_id LIMIT %s",
+                [query, query, query, EXACT_USERNAME_BONUS, pattern, pattern, limit],
+            )
+            return cursor.fetchall()
+
+
+class FallbackUserSearchBackend:
+    """Unranked istartswith matching for databases without a suitable index"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def reindex(self, user_ids):
+        pass
+
+    def remove(self, user_ids):
+        pass
+
+    def search(self, query, limit):
+        query = query.strip()
+        if not query:
+            return []
+        matches = User.objects.filter(Q(username__istartswith=query) | Q(profile__name__istartswith=query))
+        return [(user_id, 0.0) for user_id in matches.order_by('id').values_list('id', flat=True)[:limit]]
+
+
+BACKENDS = {
+    'sqlite': SQLiteUserSearchBackend,
+    'postgresql': PostgresUserSearchBackend,
+}
+
+
+def user_search_backend(connection=None):
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, FallbackUserSearchBackend)(connection)
+
+
+def _chunks(user_ids):
+    user_ids = list(user_ids or [])
+    for start in range(0, len(user_ids), INDEX_BATCH_SIZE):
+        yield user_ids[start:start + INDEX_BATCH_SIZE]
+
+
+def index_users(user_ids):
+    """(Re)build the index rows of the given users"""
+    backend = user_search_backend()
+    for chunk in _chunks(user_ids):
+        backend.reindex(chunk)
+
+
+def unindex_users(user_ids):
+    backend = user_search_backend()
+    for chunk in _chunks(user_ids):
+        backend.remove(chunk)
+
+
+def matching_user_ids(query, limit=USER_SEARCH_MAX_RESULTS):
+    """IDs of users whose username or name matches `query`, best match first"""
+    return [user_id for user_id, _ in user_search_backend().search(query, limit)]
+
+
+def user_search_page(query, user, cursor=None, per_page=PAGE_SIZE):
+    """
+    One page of the users other than `user` matching `query`, best first,
+    and the number of matches. The cursor is the (score, id) of the last user
+    shown.
+    """
+    ranked = [match for match in user_search_backend().search(query, USER_SEARCH_MAX_RESULTS) if match[0] != user.id]
+    ranked.sort(key=lambda match: (-match[1], match[0]))
+    keys = [(-score, user_id) for user_id, score in ranked]
+
+    position = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            score, user_id = values
+            score, user_id = float(score), int(user_id)
+        except (ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        position = bisect_right(keys, (-score, user_id))
+
+    shown = ranked[position:position + per_page]
+    users = User.objects.select_related('profile').in_bulk([user_id for user_id, _ in shown])
+    page = [users[user_id] for user_id, _ in shown if user_id in users]
+
+    if position + per_page < len(ranked):
+        last_id, last_score = shown[-1]
+        return KeysetPage(page, encode_cursor([last_score, last_id])), len(ranked)
+    return KeysetPage(page, None), len(ranked)
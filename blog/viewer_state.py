@@ -0,0 +1,45 @@
+"""
+Per-viewer state for list pages, loaded once per page.
+
+Cards need to know whether the viewer liked a post or follows (or asked to
+follow) a user. Instead of one query per card, `viewer_state()` loads the
+viewer's likes and follow edges for exactly the rows on the current page, one
+query each, and templates test membership in the resulting sets:
+
+    {% if blog.id in viewer.liked_blog_ids %} ... {% endif %}
+    {% if user.id in viewer.following_ids %} ... {% endif %}
+"""
+from .models import Follow, Like
+
+
+class ViewerState:
+    """Sets of IDs describing the viewer's relationship to the rows of one page"""
+
+    def __init__(self, liked_blog_ids=(), following_ids=(), requested_ids=()):
+        self.liked_blog_ids = set(liked_blog_ids)
+        self.following_ids = set(following_ids)      # approved follows
+        self.requested_ids = set(requested_ids)      # pending follow requests
+
+
+def viewer_state(viewer, blogs=(), users=()):
+    """
+    Likes of `viewer` on `blogs` and follow edges from `viewer` to `users`
+    (at most one query each; none for anonymous viewers or empty pages).
+    """
+    if viewer is None or not viewer.is_authenticated:
+        return ViewerState()
+
+    blog_ids = [blog.id for blog in blogs]
+    user_ids = [user.id for user in users]
+
+    liked = []
+    if blog_ids:
+        liked = Like.objects.filter(user=viewer, blog_id__in=blog_ids).values_list('blog_id', flat=True)
+
+    following, requested = [], []
+    if user_ids:
+        edges = Follow.objects.filter(follower=viewer, following_id__in=user_ids)
+        for following_id, is_approved in edges.values_list('following_id', 'is_approved'):
+            (following if is_approved else requested).append(following_id)
+
+    return ViewerState(liked, following, requested)
@@ -1,5 +1,5 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -7,9 +7,10 @@ from .forms import *
 from django.db.models import Count
 import json
 from django.db.models import Sum, Count
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST, condition
+from django.views.decorators.cache import cache_control
 from django.template.loader import render_to_string
-from django.db.models import F
+from django.db.models import F, Q
 from django.utils.safestring import mark_safe
 from datetime import timedelta, date
 from django.utils import timezone
@@ -18,9 +19,25 @@ from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth import logout
 from .models import UserEmail
 from .utils import create_and_send_otp
+from .pagination import paginate, wants_next_page, page_json, InvalidCursor, KeysetPage, NEWEST_FIRST, OLDEST_FIRST, TRENDING_ORDER, COMMENTS_PAGE_SIZE, REPLIES_PAGE_SIZE
+from . import unique_viewers, view_counter
+from .search import matching_ids, search_page
+from .user_search import matching_user_ids, user_search_page
+from .vocabulary import suggestion_etag
+from .tagging import parse_tagify, set_blog_tags
+from .rendering import make_excerpt
+from .notifications import notify_grouped, unread_count, latest_notifications
+from .viewer_state import viewer_state
+from .trending import TRENDING_WINDOWS, ensure_scores
+from .timeline import timeline_page, fan_out_blog, remove_blog_from_timelines, backfill_timeline, backfill_timelines, drop_author_from_timeline
 from django.core.mail import send_mail
 import random
 from django.db.models import Q
+from django.db import transaction
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.urls import reverse
+import hashlib
 
 @login_required
 def create_or_edit_profile(request):
@@ -57,15 +74,11 @@ def create_or_edit_profile(request):
 @login_required
 def profile_view(request):
     profile = request.user.profile
-    user_obj = request.user  # This is key
-
-    followers_count = Follow.objects.filter(following=user_obj, is_approved=True).count()
-    following_count = Follow.objects.filter(follower=user_obj, is_approved=True).count()
 
     return render(request, 'blog/view_profile.html', {
         'profile': profile,
-        'followers_count': followers_count,
-        'following_count': following_count,
+        'followers_count': profile.followers_count,
+        'following_count': profile.following_count,
     })
 
 
@@ -114,62 +127,119 @@ def dashboard_view(request):
 
 @login_required
 def blog(request):
-    # Fetch all published blogs
-    all_blogs = Blog.objects.filter(is_published=True).select_related('author', 'author__user', 'category').prefetch_related('tags')
-
-    visible_blogs = []
-
-    for blog_post in all_blogs:
-        profile = blog_post.author  # Profile object
-        user_obj = profile.user     # User object
-
-        # Public profiles → everyone sees
-        if profile.profile_visibility == 'public':
-            visible_blogs.append(blog_post)
-        elif profile.profile_visibility == 'followers':
-            if request.user.is_authenticated and (
-                request.user.id == profile.user.id or Follow.objects.filter(follower=request.user, following=profile.user, is_approved=True).exists()):
-                visible_blogs.append(blog_post)
-            elif profile.profile_visibility == 'private':
-                if request.user.is_authenticated and request.user.id == profile.user.id:
-                    visible_blogs.append(blog_post)
-
-    # Annotate counts
-    for blog_post in visible_blogs:
-        blog_post.num_likes = blog_post.likes.count()
-        blog_post.num_comments = blog_post.comments.count()
-    
+    # Fetch published blogs the current user is allowed to see (single query)
+    visible_blogs = (
+        Blog.objects.published()
+        .visible_to(request.user)
+        .without_body()
+        .select_related('author', 'author__user', 'category')
+        .prefetch_related('tags')
+    )
+    blogs_page = paginate(request, visible_blogs, NEWEST_FIRST)
+
+    # The viewer's likes and author follows for this page, so cards don't query one by one
+    viewer = viewer_state(request.user, blogs=blogs_page, users=[blog.author.user for blog in blogs_page])
+
+    # Infinite scroll asks for the next page as JSON
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/blog_card.html', 'blog', {'viewer': viewer})
+
+    categories = Category.objects.all()
+
+    return render(request, 'blog/blogs.html', {'blogs': blogs_page, 'categories': categories, 'unread_count': unread_count(request.user), 'viewer': viewer})
+
+@login_required
+def following_feed(request):
+    """Posts from the people the user follows, read from the materialized timeline"""
+    try:
+        blogs_page = timeline_page(request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+
+    viewer = viewer_state(request.user, blogs=blogs_page, users=[blog.author.user for blog in blogs_page])
+
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/blog_card.html', 'blog', {'viewer': viewer})
+
+    categories = Category.objects.all()
+
+    return render(request, 'blog/blogs.html', {
+        'blogs': blogs_page,
+        'categories': categories,
+        'unread_count': unread_count(request.user),
+        'feed': 'following',
+        'viewer': viewer,
+    })
+
+@login_required
+def search_blogs(request):
+    """Full-text search over title, content, excerpt, tags and category, best match first"""
+    search_query = request.GET.get('q', '').strip()
+    try:
+        blogs_page = search_page(search_query, request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+
+    viewer = viewer_state(request.user, blogs=blogs_page, users=[blog.author.user for blog in blogs_page])
+
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/blog_card.html', 'blog', {'viewer': viewer})
 
     categories = Category.objects.all()
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-    unread_count = notifications.filter(is_read=False).count()
 
-    return render(request, 'blog/blogs.html', {'blogs': visible_blogs, 'categories': categories, 'notifications': notifications,'unread_count': unread_count})
+    return render(request, 'blog/blogs.html', {
+        'blogs': blogs_page,
+        'categories': categories,
+        'unread_count': unread_count(request.user),
+        'feed': 'search',
+        'search_query': search_query,
+        'viewer': viewer,
+    })
 
 @require_POST
 def increment_blog_view(request, blog_id):
-    blog = get_object_or_404(Blog, id=blog_id, is_published=True)
+    # Views go through a write-behind buffer; the blog row is only read on a cache miss
+    info = view_counter.blog_info(blog_id)
+    if info is None:
+        raise Http404("No Blog matches the given query.")
+
+    if request.user.is_authenticated and info['author_id'] == request.user.id:
+        return JsonResponse({'status': 'skipped', 'views': view_counter.approximate_views(blog_id)})
+
+    if unique_viewers.is_new_viewer(blog_id, unique_viewers.viewer_key(request)):
+        view_counter.record_view(blog_id)
+        return JsonResponse({'status': 'incremented', 'views': view_counter.approximate_views(blog_id)})
 
-    if request.user.is_authenticated and blog.author.user == request.user:
-        return JsonResponse({'status': 'skipped', 'views': blog.views})
+    return JsonResponse({'status': 'already_viewed', 'views': view_counter.approximate_views(blog_id)})
+
+@login_required
+@require_GET
+def blog_body(request, blog_id):
+    """The rendered body of a post, fetched when its card is opened (lists never load it)"""
+    blog = get_object_or_404(Blog.objects.readable_by(request.user).only('id', 'content_html'), id=blog_id)
+    return JsonResponse({'content_html': blog.content_html})
 
-    session_key = f"viewed_blog_{blog.id}"
-    if not request.session.get(session_key, False):
-        Blog.objects.filter(id=blog.id).update(views=F('views') + 1)
-        request.session[session_key] = True
-        blog.refresh_from_db(fields=['views'])
-        return JsonResponse({'status': 'incremented', 'views': blog.views})
+# Names returned per suggestion request (matches the Tagify dropdown size)
+SUGGESTION_LIMIT = 10
+SUGGESTION_MAX_AGE = 300
 
-    return JsonResponse({'status': 'already_viewed', 'views': blog.views})
 
 @login_required
+@cache_control(private=True, max_age=SUGGESTION_MAX_AGE)
+@condition(etag_func=lambda request: suggestion_etag(request, Tag))
 def tag_suggestions(request):
-    tags = list(Tag.objects.values_list('name', flat=True))
+    """Most used tags starting with ?q=, as a JSON list of names"""
+    prefix = request.GET.get('q', '')[:Tag._meta.get_field('name').max_length]
+    tags = list(Tag.objects.suggest(prefix, SUGGESTION_LIMIT))
     return JsonResponse(tags, safe=False)
 
 @login_required
+@cache_control(private=True, max_age=SUGGESTION_MAX_AGE)
+@condition(etag_func=lambda request: suggestion_etag(request, Category))
 def category_suggestions(request):
-    categories = list(Category.objects.values_list('name', flat=True))
+    """Most used categories starting with ?q=, as a JSON list of names"""
+    prefix = request.GET.get('q', '')[:Category._meta.get_field('name').max_length]
+    categories = list(Category.objects.suggest(prefix, SUGGESTION_LIMIT))
     return JsonResponse(categories, safe=False)
 
 @login_required
@@ -183,13 +253,7 @@ def create_blog(request):
         content = request.POST.get("content")
         is_published = bool(request.POST.get("is_published"))
         image = request.FILES.get("image")
-        tags_input = request.POST.get("tags", "[]")
-
-        # Parse Tagify input (JSON string)
-        try:
-            tags_list = [t["value"].strip() for t in json.loads(tags_input) if t["value"].strip()]
-        except json.JSONDecodeError:
-            tags_list = []
+        tags_list = parse_tagify(request.POST.get("tags"))
 
         # Validate required fields
         if not title or not content or not category_id:
@@ -199,12 +263,8 @@ def create_blog(request):
             })
 
         # Get category object
-        category_input = request.POST.get("category", "")
-        try:
-            category_data = json.loads(category_input)
-            category_name = category_data[0]["value"].strip() if category_data else ""
-        except json.JSONDecodeError:
-            category_name = category_input.strip()
+        category_names = parse_tagify(request.POST.get("category"))
+        category_name = category_names[0] if category_names else ""
 
         if not category_name:
             return render(request, "blog/create_blog.html", {
@@ -226,10 +286,11 @@ def create_blog(request):
             slug=slugify(title)
         )
 
-        # Handle tags (auto-create if not exist)
-        for tag_name in tags_list:
-            tag, _ = Tag.objects.get_or_create(name=tag_name, defaults={'slug': slugify(tag_name)})
-            blog.tags.add(tag)
+        # Handle tags (auto-create if not exist), in a fixed number of queries
+        set_blog_tags(blog, tags_list, created=True)
+
+        # Push the new post into followers' timelines
+        fan_out_blog(blog)
 
         return redirect("blogs")  # redirect wherever you want after publishing
 
@@ -245,18 +306,38 @@ def edit_blog(request, slug):
     tags = list(blog.tags.values_list('name', flat=True))  # ✅ define early
 
     if request.method == 'POST':
+        was_published = blog.is_published
+        # An excerpt generated from the old body is regenerated from the new one
+        excerpt = request.POST.get('excerpt', blog.excerpt).strip()
+        if excerpt == blog.excerpt and excerpt == make_excerpt(blog.content):
+            excerpt = ''
         blog.title = request.POST.get('title')
         blog.content = request.POST.get('content')
+        blog.excerpt = excerpt
         blog.is_published = 'is_published' in request.POST
 
-        category_id = request.POST.get('category')
-        if category_id:
-            blog.category_id = category_id
+        # The category input is a Tagify field posting the category name
+        category_names = parse_tagify(request.POST.get('category'))
+        if category_names:
+            blog.category, _ = Category.objects.get_or_create(
+                name=category_names[0], defaults={'slug': slugify(category_names[0])}
+            )
 
         if 'image' in request.FILES:
             blog.image = request.FILES['image']
 
         blog.save()
+
+        # Only the added/removed tags are written
+        if 'tags' in request.POST:
+            set_blog_tags(blog, parse_tagify(request.POST['tags']))
+
+        # Keep follower timelines in sync when the publish state flips
+        if blog.is_published and not was_published:
+            fan_out_blog(blog)
+        elif was_published and not blog.is_published:
+            remove_blog_from_timelines(blog)
+
         messages.success(request, 'Blog updated successfully!')
         return redirect('user_blog')
 
@@ -295,52 +376,64 @@ def view_user_profile(request, username):
     else:
         is_follower = True
 
-    # Fetch blogs
-    blogs = Blog.objects.filter(author=profile, is_published=True).order_by('-created_at')
+    # Fetch blogs (same visibility rules as the Explore feed)
+    blogs = (
+        Blog.objects.published()
+        .filter(author=profile)
+        .visible_to(request.user)
+        .without_body()
+        .select_related('author', 'author__user', 'category')
+    )
+    blogs_page = paginate(request, blogs, NEWEST_FIRST)
+
+    viewer = viewer_state(request.user, blogs=blogs_page, users=[blog.author.user for blog in blogs_page])
+
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/blog_card.html', 'blog', {'viewer': viewer})
 
     # Check if request.user is following this profile
     is_following = Follow.objects.filter(follower=request.user, following=user_obj, is_approved=True).exists()
 
-    # Calculate followers/following counts
-    followers_count = Follow.objects.filter(following=user_obj, is_approved=True).count()
-    following_count = Follow.objects.filter(follower=user_obj, is_approved=True).count()
-
     return render(request, 'blog/profile_view.html', {
         'profile': profile,
-        'blogs': blogs,
+        'blogs': blogs_page,
+        'viewer': viewer,
         'is_following': is_following,
-        'followers_count': followers_count,
-        'following_count': following_count,
+        'followers_count': profile.followers_count,
+        'following_count': profile.following_count,
     })
 
 @login_required
 def my_blogs(request):
     user_profile = request.user.profile
 
+    my_published = Blog.objects.filter(author=user_profile, is_published=True)
+
     blogs = (
-        Blog.objects.filter(author=user_profile, is_published=True)
+        my_published
+        .without_body()
         .select_related('author', 'category')
         .prefetch_related('tags')
-        .annotate(
-            num_likes=Count('likes', distinct=True),
-            num_comments=Count('comments', distinct=True),
-            num_views=Count('views', distinct=True)
-        )
-        .order_by('-created_at')
     )
+    blogs_page = paginate(request, blogs, NEWEST_FIRST)
 
-    # Compute stats directly from DB fields
-    total_blogs = blogs.count()
-    total_likes = blogs.aggregate(total_likes=Sum('likes'))['total_likes'] or 0  # safe fallback
-    total_views = blogs.aggregate(total_views=Sum('views'))['total_views'] or 0
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/my_blog_card.html', 'blog')
 
-    # Since we annotated likes/comments, adjust aggregation properly
-    total_likes = sum(blog.num_likes for blog in blogs)
-    total_comments = sum(blog.num_comments for blog in blogs)
-    total_views = sum(blog.num_views for blog in blogs)
+    # Compute stats over all of the user's blogs from the counter columns (one query)
+    totals = my_published.aggregate(
+        total_blogs=Count('id'),
+        total_views=Sum('views'),
+        total_likes=Sum('like_count'),
+        total_comments=Sum('comment_count'),
+    )
+    total_blogs = totals['total_blogs']
+    total_views = totals['total_views'] or 0
+    total_likes = totals['total_likes'] or 0
+    total_comments = totals['total_comments'] or 0
 
     context = {
-        'blogs': blogs,
+        'blogs': blogs_page,
         'categories': Category.objects.all(),
         'total_blogs': total_blogs,
         'total_likes': total_likes,
@@ -354,25 +447,29 @@ def my_blogs(request):
 @login_required
 def toggle_like(request, blog_id):
     blog = get_object_or_404(Blog, id=blog_id)
-    like, created = Like.objects.get_or_create(user=request.user, blog=blog)
 
-    if not created:
-        # Already liked → remove it
-        like.delete()
-        liked = False
-    else:
-        liked = True
-        if blog.author.user != request.user:
-            Notification.objects.create(
-                recipient=blog.author.user,
-                sender=request.user,
-                blog=blog,
-                notification_type='like'
-            )
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=request.user, blog=blog)
+
+        if not created:
+            # Already liked → remove it
+            deleted, _ = like.delete()
+            if deleted:
+                Blog.objects.filter(id=blog.id).update(like_count=F('like_count') - 1)
+            liked = False
+        else:
+            Blog.objects.filter(id=blog.id).update(like_count=F('like_count') + 1)
+            liked = True
+
+        blog.refresh_from_db(fields=['like_count'])
+
+    if liked and blog.author.user != request.user:
+        # Coalesced into the post's like group for the day (an unlike/re-like counts once)
+        notify_grouped(blog.author.user, request.user, 'like', blog=blog)
 
     return JsonResponse({
         'liked': liked,
-        'like_count': blog.likes.count(),
+        'like_count': blog.like_count,
     })
 
 @login_required
@@ -385,12 +482,16 @@ def add_comment(request, blog_id):
         return JsonResponse({'success': False, 'error': 'Empty comment'}, status=400)
 
     parent = Comment.objects.filter(id=parent_id).first() if parent_id else None
-    comment = Comment.objects.create(
-        blog=blog,
-        user=request.user,
-        content=content,
-        parent=parent
-    )
+    with transaction.atomic():
+        comment = Comment.objects.create(
+            blog=blog,
+            user=request.user,
+            content=content,
+            parent=parent
+        )
+        Blog.objects.filter(id=blog.id).update(comment_count=F('comment_count') + 1)
+        if parent:
+            Comment.objects.filter(id=parent.id).update(reply_count=F('reply_count') + 1)
 
     # Render just one comment block (no recursion)
     html = render_to_string('blog/comment_single.html', {'comment': comment}, request=request)
@@ -399,72 +500,64 @@ def add_comment(request, blog_id):
 
 @login_required
 def load_comments(request, blog_id):
-    blog = get_object_or_404(Blog, id=blog_id)
-    comments = blog.comments.filter(is_approved=True, parent__isnull=True)
-    return render(request, 'blog/comments.html', {'comments': comments})
+    """First page of top-level comments (HTML); later pages come back as JSON"""
+    blog = get_object_or_404(Blog.objects.readable_by(request.user), id=blog_id)
+    top_level = (
+        Comment.objects.filter(blog=blog, parent__isnull=True)
+        .approved()
+        .select_related('user__profile')
+    )
+    comments_page = paginate(request, top_level, OLDEST_FIRST, COMMENTS_PAGE_SIZE)
+
+    if wants_next_page(request):
+        return page_json(request, comments_page, 'blog/comment_single.html', 'comment')
+
+    return render(request, 'blog/comments.html', {'blog': blog, 'comments': comments_page})
+
+
+@login_required
+def load_replies(request, comment_id):
+    """One page of direct replies to a comment, as JSON"""
+    parent = get_object_or_404(
+        Comment, id=comment_id, is_approved=True, blog__in=Blog.objects.readable_by(request.user)
+    )
+    replies = parent.replies.approved().select_related('user__profile')
+    replies_page = paginate(request, replies, OLDEST_FIRST, REPLIES_PAGE_SIZE)
+    return page_json(request, replies_page, 'blog/comment_single.html', 'comment')
 
 
 @login_required
 def trending(request):
     filter_option = request.GET.get('filter', 'all')
     search_query = request.GET.get('q', '')
+    window = filter_option if filter_option in TRENDING_WINDOWS else 'all'
 
-    blogs = Blog.objects.all().order_by('-views', '-created_at')
+    # Precomputed by `manage.py compute_trending`; one range scan on (window, score)
+    ensure_scores()
+    scores = TrendingScore.objects.filter(window=window)
 
-    # Apply existing date filters
-    if filter_option == 'today':
-        blogs = blogs.filter(created_at__date=date.today())
-    elif filter_option == 'week':
-        week_ago = timezone.now() - timedelta(days=7)
-        blogs = blogs.filter(created_at__gte=week_ago)
-    elif filter_option == 'month':
-        month_ago = timezone.now() - timedelta(days=30)
-        blogs = blogs.filter(created_at__gte=month_ago)
-
-    # Apply search filter
+    # Apply search filter (full-text index, see blog/search.py)
     if search_query:
-        blogs = blogs.filter(title__icontains=search_query)
-
-    # --- Trending logic ---
-    trending_blogs = blogs[:3]  # Top 3 blogs
-
-    for blog in trending_blogs:
-        author_user = blog.author.user
-        # Check if the notification already exists to avoid spamming
-        already_notified = Notification.objects.filter(
-            recipient=author_user,
-            notification_type='trending',
-            blog=blog
-        ).exists()
-
-        if not already_notified:
-            Notification.objects.create(
-                recipient=author_user,
-                sender=None,  # System-generated
-                notification_type='trending',
-                blog=blog,
-                message=f"Your blog '{blog.title}' is now trending in the top 3!"
-            )
+        scores = scores.filter(blog_id__in=matching_ids(search_query))
+
+    # --- Visibility filtering ---
+    visible_scores = (
+        scores.filter(blog__in=Blog.objects.published().visible_to(request.user))
+        .select_related('blog__author__user')
+        .defer(*('blog__' + field for field in Blog.BODY_FIELDS))
+        .prefetch_related('blog__tags')
+    )
+    scores_page = paginate(request, visible_scores, TRENDING_ORDER)
+    blogs_page = KeysetPage([score.blog for score in scores_page], scores_page.next_cursor)
+
+    if wants_next_page(request):
+        return page_json(request, blogs_page, 'blog/trending_card.html', 'blog')
 
-    # --- Visibility filtering (your original logic) ---
-    visible_blogs = []
-    for blog_post in blogs.select_related('author', 'author__user').prefetch_related('tags'):
-        profile = blog_post.author
-        user_obj = profile.user
-
-        if profile.profile_visibility == 'public':
-            visible_blogs.append(blog_post)
-        elif profile.profile_visibility == 'followers':
-            if request.user.is_authenticated and (
-                request.user.id == profile.user.id or 
-                Follow.objects.filter(follower=request.user, following=profile.user, is_approved=True).exists()
-            ):
-                visible_blogs.append(blog_post)
-        elif profile.profile_visibility == 'private':
-            if request.user.is_authenticated and request.user.id == profile.user.id:
-                visible_blogs.append(blog_post)
-
-    context = {'blogs': visible_blogs}
+    context = {
+        'blogs': blogs_page,
+        'filter_option': filter_option,
+        'search_query': search_query,
+    }
     return render(request, 'blog/trending_blogs.html', context)
 
 
@@ -724,14 +817,69 @@ def verify_otp(request):
 @login_required
 def search_users(request):
     query = request.GET.get('q', '').strip()
-    users = User.objects.exclude(id=request.user.id).select_related('profile')
 
-    if query:
-        users = users.filter(
-            Q(username__icontains=query) | Q(profile__name__icontains=query)
+    # Nothing is listed until the user types something; best match first
+    try:
+        users_page, result_count = user_search_page(query, request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+
+    # The viewer's follow edges to the users on this page (one query)
+    viewer = viewer_state(request.user, users=users_page)
+
+    if wants_next_page(request):
+        return page_json(request, users_page, 'blog/user_card.html', 'user', {'viewer': viewer})
+
+    return render(request, 'blog/search_users.html', {
+        'users': users_page,
+        'query': query,
+        'result_count': result_count,
+        'viewer': viewer,
+    })
+
+
+# Suggestions returned per keystroke
+USER_SUGGEST_LIMIT = 8
+USER_SUGGEST_CACHE_SECONDS = 60
+
+
+@login_required
+def suggest_users(request):
+    """Ranked username/name matches for search-as-you-type, as JSON"""
+    query = request.GET.get('q', '').strip()[:50]
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+
+    # Shared across users: popular prefixes are typed by everyone
+    cache_key = f"user_suggest:{hashlib.md5(query.lower().encode()).hexdigest()}"
+    results = cache.get(cache_key)
+    if results is None:
+        user_ids = matching_user_ids(query, limit=USER_SUGGEST_LIMIT + 1)
+        rows = User.objects.filter(id__in=user_ids).values(
+            'id', 'username', 'profile__name', 'profile__profile_picture'
         )
+        rows = {row['id']: row for row in rows}
+
+        results = []
+        for user_id in user_ids:
+            row = rows.get(user_id)
+            if row is None:
+                continue
+            picture = row['profile__profile_picture']
+            results.append({
+                'id': user_id,
+                'username': row['username'],
+                'name': row['profile__name'] or '',
+                'picture': default_storage.url(picture) if picture else '',
+                'url': reverse('view_user_profile', args=[row['username']]),
+            })
+        cache.set(cache_key, results, USER_SUGGEST_CACHE_SECONDS)
+
+    results = [user for user in results if user['id'] != request.user.id][:USER_SUGGEST_LIMIT]
 
-    return render(request, 'blog/search_users.html', {'users': users, 'query': query})
+    response = JsonResponse({'results': results})
+    response['Cache-Control'] = f'private, max-age={USER_SUGGEST_CACHE_SECONDS}'
+    return response
 
 @login_required
 def send_follow_request(request, username):
@@ -768,31 +916,118 @@ def send_follow_request(request, username):
         )
         messages.success(request, f"Follow request sent to {username}.")
     else:
-        follow = Follow.objects.create(
-            follower=request.user,
-            following=target_user,
-            is_approved=True
-        )
-        Notification.objects.create(
-            recipient=target_user,
-            sender=request.user,
-            follow=follow,
-            notification_type='follow',
-            message=f"{request.user.username} started following you."
-        )
+        with transaction.atomic():
+            Follow.objects.create(
+                follower=request.user,
+                following=target_user,
+                is_approved=True
+            )
+            Follow.adjust_counts(request.user.id, target_user.id, +1)
+        backfill_timeline(request.user, target_user)
+        notify_grouped(target_user, request.user, 'follow')
         messages.success(request, f"You are now following {username}.")
 
     return redirect('view_user_profile', username=username)
 
 
+@login_required
+def follow_requests(request):
+    pending = (
+        Follow.objects.filter(following=request.user, is_approved=False)
+        .select_related('follower__profile')
+    )
+    requests_page = paginate(request, pending, NEWEST_FIRST)
+
+    if wants_next_page(request):
+        return page_json(request, requests_page, 'blog/follow_request_item.html', 'follow')
+
+    return render(request, 'blog/follow_requests.html', {'follow_requests': requests_page})
+
+
+# Most requests answered by one bulk approve/reject
+BULK_FOLLOW_REQUESTS_LIMIT = 500
+
+
+@login_required
+@require_POST
+def bulk_follow_requests(request):
+    """Approve or reject many pending follow requests in one transaction"""
+    action = request.POST.get('action')
+    if action not in ['approve', 'reject']:
+        return JsonResponse({"error": "Invalid action"}, status=400)
+
+    try:
+        follow_ids = {int(follow_id) for follow_id in request.POST.getlist('follow_ids')}
+    except ValueError:
+        return JsonResponse({"error": "Invalid follow request id"}, status=400)
+    if not follow_ids:
+        return JsonResponse({"error": "No follow requests selected"}, status=400)
+    if len(follow_ids) > BULK_FOLLOW_REQUESTS_LIMIT:
+        return JsonResponse(
+            {"error": f"At most {BULK_FOLLOW_REQUESTS_LIMIT} requests can be handled at once"},
+            status=400
+        )
+
+    with transaction.atomic():
+        # Lock the requests so a concurrent approve/reject cannot double count
+        pending = list(
+            Follow.objects.select_for_update()
+            .filter(id__in=follow_ids, following=request.user, is_approved=False)
+            .values_list('id', 'follower_id', 'follower__username')
+        )
+        handled_ids = [follow_id for follow_id, _, _ in pending]
+        follower_ids = [follower_id for _, follower_id, _ in pending]
+
+        if action == 'approve':
+            Follow.objects.filter(id__in=handled_ids).update(is_approved=True)
+            Follow.adjust_counts_for_followers(follower_ids, request.user.id, +1)
+
+            # Turn the request notifications into "You accepted ..." entries
+            usernames = {follow_id: username for follow_id, _, username in pending}
+            request_notifs = list(
+                Notification.objects.filter(
+                    recipient=request.user, notification_type='follow_request', follow_id__in=handled_ids
+                ).only('id', 'follow_id')
+            )
+            for notif in request_notifs:
+                notif.message = f"You accepted {usernames[notif.follow_id]}'s follow request."
+                notif.is_read = True
+            Notification.objects.bulk_update(request_notifs, ['message', 'is_read'])
+
+            reply = f"{request.user.username} accepted your follow request."
+        else:
+            # Cascades to the request notifications
+            Follow.objects.filter(id__in=handled_ids).delete()
+            reply = f"{request.user.username} rejected your follow request."
+
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=follower_id,
+                sender=request.user,
+                notification_type='follow_request',
+                message=reply
+            )
+            for follower_id in follower_ids
+        ])
+
+    if action == 'approve':
+        backfill_timelines(follower_ids, request.user)
+
+    return JsonResponse({
+        "status": "approved" if action == 'approve' else "rejected",
+        "count": len(handled_ids),
+        "follow_ids": handled_ids
+    })
+
+
 @login_required
 def approve_follow_request(request, follower_username):
     follower_user = get_object_or_404(User, username=follower_username)
     follow_obj = get_object_or_404(
         Follow, follower=follower_user, following=request.user, is_approved=False
     )
-    follow_obj.is_approved = True
-    follow_obj.save()
+    if follow_obj.approve():
+        backfill_timeline(follower_user, request.user)
 
     messages.success(request, f"You approved {follower_user.username}'s follow request.")
     return redirect('follow_requests')
@@ -819,7 +1054,11 @@ def follow_user(request, user_id):
     existing = Follow.objects.filter(follower=request.user, following=target_user).first()
     if existing:
         if existing.is_approved:
-            existing.delete()
+            with transaction.atomic():
+                deleted, _ = existing.delete()
+                if deleted:
+                    Follow.adjust_counts(request.user.id, target_user.id, -1)
+            drop_author_from_timeline(request.user, target_user)
             return JsonResponse({"status": "unfollowed", "message": f"You unfollowed {target_user.username}."})
         else:
             return JsonResponse({"message": f"Follow request to {target_user.username} is pending."}, status=200)
@@ -829,7 +1068,10 @@ def follow_user(request, user_id):
         Follow.objects.create(follower=request.user, following=target_user, is_approved=False)
         return JsonResponse({"status": "requested", "message": f"Follow request sent to {target_user.username}."})
     else:
-        Follow.objects.create(follower=request.user, following=target_user, is_approved=True)
+        with transaction.atomic():
+            Follow.objects.create(follower=request.user, following=target_user, is_approved=True)
+            Follow.adjust_counts(request.user.id, target_user.id, +1)
+        backfill_timeline(request.user, target_user)
         return JsonResponse({"status": "followed", "message": f"You are now following {target_user.username}."})
 
 
@@ -841,7 +1083,11 @@ def unfollow_user(request, user_id):
     if not follow_relation:
         messages.warning(request, f"You are not following {target_user.username}.")
     else:
-        follow_relation.delete()
+        with transaction.atomic():
+            deleted, _ = follow_relation.delete()
+            if deleted and follow_relation.is_approved:
+                Follow.adjust_counts(request.user.id, target_user.id, -1)
+        drop_author_from_timeline(request.user, target_user)
         messages.success(request, f"You unfollowed {target_user.username}.")
 
     return redirect('view_user_profile', username=target_user.username)
@@ -858,7 +1104,11 @@ def toggle_follow_ajax(request, username):
     relation = Follow.objects.filter(follower=request.user, following=target).first()
 
     if relation and relation.is_approved:
-        relation.delete()
+        with transaction.atomic():
+            deleted, _ = relation.delete()
+            if deleted:
+                Follow.adjust_counts(request.user.id, target.id, -1)
+        drop_author_from_timeline(request.user, target)
         return JsonResponse({"status": "unfollowed"})
     if relation and not relation.is_approved:
         return JsonResponse({"status": "requested"})
@@ -874,21 +1124,38 @@ def toggle_follow_ajax(request, username):
         )
         return JsonResponse({"status": "requested"})
     else:
-        Follow.objects.create(follower=request.user, following=target, is_approved=True)
-        Notification.objects.create(
-            recipient=target,
-            sender=request.user,
-            notification_type='follow'
-        )
+        with transaction.atomic():
+            Follow.objects.create(follower=request.user, following=target, is_approved=True)
+            Follow.adjust_counts(request.user.id, target.id, +1)
+        backfill_timeline(request.user, target)
+        notify_grouped(target, request.user, 'follow')
     return JsonResponse({"status": "followed"})
 
 
 @login_required
 def notification_panel(request):
     notifications = Notification.objects.filter(recipient=request.user)\
-                        .select_related('sender', 'blog', 'comment', 'follow')\
-                        .order_by('-created_at')
-    return render(request, 'blog/notifications.html', {'notifications': notifications})
+                        .select_related('sender__profile', 'recipient__profile', 'blog', 'comment', 'follow')
+    notifications_page = paginate(request, notifications, NEWEST_FIRST)
+
+    if wants_next_page(request):
+        return page_json(request, notifications_page, 'blog/notification_item.html', 'notif')
+
+    return render(request, 'blog/notifications.html', {'notifications': notifications_page})
+
+
+@login_required
+@require_GET
+def notification_dropdown(request):
+    """The latest notifications for the header dropdown, fetched when the bell is opened"""
+    html = ''.join(
+        render_to_string('blog/notification_item.html', {'notif': notif}, request=request)
+        for notif in latest_notifications(request.user)
+    )
+    return JsonResponse({
+        'html': html,
+        'unread_count': unread_count(request.user),
+    })
 
 
 @login_required
@@ -918,8 +1185,8 @@ def handle_follow_request(request, notif_id, action):
         return JsonResponse({"error": "Follow request not found"}, status=404)
 
     if action == 'approve':
-        follow_obj.is_approved = True
-        follow_obj.save()   
+        if follow_obj.approve():
+            backfill_timeline(follow_obj.follower, request.user)
 
         # Update notification for current user (the one accepting)
         notif.message = f"You accepted {follow_obj.follower.username}'s follow request."
@@ -943,7 +1210,10 @@ def handle_follow_request(request, notif_id, action):
     elif action == 'reject':
         # Save follower info before deleting
         follower_user = follow_obj.follower
-        follow_obj.delete()
+        with transaction.atomic():
+            deleted, _ = follow_obj.delete()
+            if deleted and follow_obj.is_approved:
+                Follow.adjust_counts(follower_user.id, request.user.id, -1)
 
         # Update notification for current user
         notif.message = f"You rejected {follower_user.username}'s follow request."
@@ -968,13 +1238,9 @@ def handle_follow_request(request, notif_id, action):
     
 @login_required
 def notifications_view(request):
-    # Get notifications for the logged-in user, newest first
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-    unread_count = notifications.filter(is_read=False).count()
-    
+    # The dropdown itself is loaded from notification_dropdown when opened
     return render(request, 'blog/blogs.html', {
-        'notifications': notifications,
-        'unread_count': unread_count,
+        'unread_count': unread_count(request.user),
     })
 
 @login_required
@@ -984,16 +1250,19 @@ def get_follow_counts(request, username=None):
     If username is None, return counts for the logged-in user.
     """
     if username:
-        user_obj = get_object_or_404(User, username=username)
+        user_filter = {'user__username': username}
     else:
-        user_obj = request.user
+        user_filter = {'user': request.user}
 
-    followers_count = Follow.objects.filter(following=user_obj, is_approved=True).count()
-    following_count = Follow.objects.filter(follower=user_obj, is_approved=True).count()
+    # Read from the denormalized counters: one indexed row, no COUNT(*)
+    counts = get_object_or_404(
+        Profile.objects.values('followers_count', 'following_count'),
+        **user_filter
+    )
 
     return JsonResponse({
-        'followers_count': followers_count,
-        'following_count': following_count
+        'followers_count': counts['followers_count'],
+        'following_count': counts['following_count']
     })
 
 @login_required
@@ -1012,12 +1281,35 @@ def delete_account(request):
 
         user = request.user
 
+        # Blogs (by other authors) whose counters change when this user's likes/comments go
+        touched_blogs = list(
+            Blog.objects.exclude(author=user.profile)
+            .filter(Q(likes__user=user) | Q(comments__user=user))
+            .values_list('id', flat=True).distinct()
+        )
+        # People on the other end of this user's approved follows
+        touched_profiles = list(
+            Follow.objects.filter(Q(follower=user) | Q(following=user), is_approved=True)
+            .values_list('follower_id', 'following_id')
+        )
+        touched_profiles = {uid for edge in touched_profiles for uid in edge if uid != user.id}
+
+        # Other people's comments this user replied to
+        touched_comments = list(
+            Comment.objects.exclude(user=user)
+            .filter(replies__user=user)
+            .values_list('id', flat=True).distinct()
+        )
+
         # Delete all user-related data
         Blog.objects.filter(author=user.profile).delete()          # delete blogs
-        Comment.objects.filter(user=user).delete()                 # delete comments
+        Comment.objects.filter(user=user).delete()                 # delete comments (and replies to them)
         Like.objects.filter(user=user).delete()                    # delete likes
+        Blog.objects.filter(id__in=touched_blogs).recount_stats()  # fix like/comment counters
+        Comment.objects.filter(id__in=touched_comments).recount_replies()  # fix reply counters
         Follow.objects.filter(follower=user).delete()              # delete following
         Follow.objects.filter(following=user).delete()             # delete followers
+        Profile.objects.filter(user_id__in=touched_profiles).recount_follows()  # fix follow counters
 
         # Optionally, delete notifications
         user.notifications.all().delete()  # if you have a related_name on Notification model
@@ -0,0 +1,30 @@
+"""
+Version stamps for the tag and category vocabularies.
+
+Suggestion responses carry an ETag derived from a per-model version kept in
+the shared cache, so an unchanged vocabulary is revalidated with a 304 without
+touching the database. The version changes whenever a row is added, renamed
+or deleted (see `blog.signals`) and whenever usage counts change.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+
+def _version_key(model):
+    return f"vocabulary:{model._meta.model_name}:version"
+
+
+def vocabulary_version(model):
+    return cache.get_or_set(_version_key(model), lambda: uuid.uuid4().hex, None)
+
+
+def bump_vocabulary_version(model):
+    cache.set(_version_key(model), uuid.uuid4().hex, None)
+
+
+def suggestion_etag(request, model):
+    """ETag for the suggestions of `model` matching the request's ?q= prefix"""
+    prefix = request.GET.get('q', '').strip().lower()
+    return hashlib.md5(f"{vocabulary_version(model)}:{prefix}".encode()).hexdigest()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -134,6 +135,31 @@ DATABASES = {
     }
 }
 
+# Cache shared by every web worker and the cron jobs: Redis when REDIS_URL is
+# set, otherwise a database table (python manage.py createcachetable).
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "blog_cache",
+            # Per-post viewer filters and per-user counts add up to far more
+            # than the default 300 entries; culling them recounts viewers
+            "OPTIONS": {"MAX_ENTRIES": 100000},
+        }
+    }
+
+# Reverse proxies in front of the app that append the client address to
+# X-Forwarded-For. With none, REMOTE_ADDR is the client and the header (which
+# anyone can send) is ignored.
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators